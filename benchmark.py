@@ -0,0 +1,295 @@
+# benchmark.py
+# Benchmark für quell.py: erzeugt synthetische Mappen im Layout "Direkt 1 - 99" (A–L)
+# und misst Laufzeit + Spitzen-Speicher je Stufe. Ergebnis als JSON (Vergleich zwischen Versionen).
+#
+#   python benchmark.py --sizes 1000 10000 100000 --out bench.json
+#
+# Stufen: read_excel -> build_data (retained_bytes = Speicher der Märkte), Streaming (iter_sheet_rows + build_data),
+# render_html (JSON / gzip) und UTF-8-Encode für den Download, dazu der gestreamte Weg
+# render_html_bytes, den App und CLI nutzen. load_workbooks ohne Markt-Speicher, mit leerem Speicher
+# (store_cold) und erneut mit gefülltem Speicher (store_warm, Delta-Einlesen ohne Änderungen).
+# --startup: Kaltstart und Rerun der App ohne Upload (neuer Prozess je Messung).
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import openpyxl
+import pandas as pd
+
+from ingest import SHEET_NAME, build_data, iter_sheet_rows, load_workbooks
+from render import render_html, render_html_bytes
+from store import MarketStore
+
+CITIES = [
+    "Hamburg", "Berlin", "Bremen", "Hannover", "Kiel", "Lübeck", "Rostock", "Schwerin",
+    "Magdeburg", "Potsdam", "Leipzig", "Dresden", "Erfurt", "Göttingen", "Oldenburg", "Osnabrück",
+    "Bielefeld", "Münster", "Dortmund", "Köln", "Düsseldorf", "Kassel", "Fulda", "Würzburg",
+]
+STREETS = ["Hauptstraße", "Bahnhofstraße", "Gartenweg", "Am Markt", "Lindenallee", "Industriestraße", "Dorfstraße"]
+CHAINS = ["EDEKA", "Markant", "Frischemarkt", "Nah & Gut", "Center", "Aktiv Markt"]
+
+
+def write_workbook(
+    path: str,
+    markets: int,
+    tours: int = 300,
+    tour_skew: float = 1.0,
+    days_per_market: Tuple[int, int] = (1, 3),
+    blank_ratio: float = 0.02,
+    extra_cols: int = 0,
+    seed: int = 0,
+) -> int:
+    """
+    Schreibt eine Mappe mit Blatt "Direkt 1 - 99" (openpyxl write-only).
+
+    tours / tour_skew:  Anzahl Tournummern und Verteilung (Gewicht 1 / Rang^skew, 0 = gleichverteilt)
+    days_per_market:    Liefertage je Markt (min, max) aus Mo–Sa
+    blank_ratio:        Anteil leerer Zeilen zwischen den Märkten
+    extra_cols:         zusätzliche Spalten hinter L (werden beim Einlesen ignoriert)
+
+    Rückgabe: Anzahl geschriebener Zeilen.
+    """
+    rnd = random.Random(seed)
+    tour_nums = [1000 + i for i in range(tours)]
+    weights = [1 / (r + 1) ** tour_skew for r in range(tours)]
+    extra = [None] * extra_cols
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_NAME)
+    rows = 0
+
+    for i in range(markets):
+        while rnd.random() < blank_ratio:
+            ws.append([None] * (12 + extra_cols))
+            rows += 1
+
+        pattern: List[Any] = [None] * 6
+        for d in rnd.sample(range(6), rnd.randint(*days_per_market)):
+            tour = rnd.choices(tour_nums, weights)[0]
+            # Excel liefert Tournummern je nach Formatierung als int, float oder Text
+            pattern[d] = rnd.choice((tour, float(tour), str(tour)))
+
+        if extra_cols:
+            extra = [rnd.choice((None, "x", rnd.randint(0, 99))) for _ in range(extra_cols)]
+
+        ws.append(
+            [
+                100000 + i,
+                rnd.choice((None, 4000000 + i, str(4000000 + i))),
+                f"{rnd.choice(CHAINS)} {i}",
+                f"{rnd.choice(STREETS)} {rnd.randint(1, 120)}",
+                f"{rnd.randint(1000, 99999):05d}",
+                rnd.choice(CITIES),
+                *pattern,
+                *extra,
+            ]
+        )
+        rows += 1
+
+    wb.save(path)
+    return rows
+
+
+def measure(fn: Callable[[], Any], repeat: int = 1, memory: bool = True) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Führt fn repeat-mal aus (beste Zeit zählt), danach einmal unter tracemalloc für den Spitzen-Speicher
+    und den Speicher, den das Ergebnis danach noch belegt (retained_bytes, z. B. die Märkte nach build_data).
+    Getrennte Läufe, damit tracemalloc die Zeitmessung nicht verfälscht.
+    """
+    best = float("inf")
+    result = None
+    for _ in range(max(repeat, 1)):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+
+    stats: Dict[str, Any] = {"seconds": round(best, 4)}
+    if memory:
+        result = None
+        tracemalloc.start()
+        try:
+            result = fn()
+            stats["retained_bytes"], stats["peak_bytes"] = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return result, stats
+
+
+def bench_file(path: str, repeat: int = 1, memory: bool = True) -> Dict[str, Dict[str, Any]]:
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    def stage(name: str, fn: Callable[[], Any], size: Optional[Callable[[Any], int]] = None) -> Any:
+        result, stats = measure(fn, repeat, memory)
+        if size is not None:
+            stats["size"] = size(result)
+        stages[name] = stats
+        return result
+
+    df = stage("read_excel", lambda: pd.read_excel(path, sheet_name=SHEET_NAME, header=None), len)
+    data = stage("build_data", lambda: build_data(df), lambda d: len(d["markets"]))
+    stage("stream_build_data", lambda: build_data(iter_sheet_rows(path, SHEET_NAME)), lambda d: len(d["markets"]))
+
+    html = stage("render_html", lambda: render_html(data), len)
+    stage("encode_utf8", lambda: html.encode("utf-8"), len)
+    html_gz = stage("render_html_gzip", lambda: render_html(data, compress=True), len)
+    stage("encode_utf8_gzip", lambda: html_gz.encode("utf-8"), len)
+    del html, html_gz
+
+    # gestreamter Weg der App: HTML direkt als UTF-8-Bytes (ersetzt render_html + encode)
+    stage("render_bytes", lambda: render_html_bytes(data)[0], len)
+    stage("render_bytes_gzip", lambda: render_html_bytes(data, compress=True)[0], len)
+
+    # Einlesen über load_workbooks wie in der App: ohne Speicher, leerer Speicher, gefüllter Speicher
+    files = [(os.path.basename(path), open(path, "rb").read())]
+    stage("load_workbooks", lambda: load_workbooks(files, jobs=1)[0], lambda d: len(d["markets"]))
+    with tempfile.TemporaryDirectory(prefix="quell-store-") as tmp:
+        n = itertools.count()
+
+        def cold() -> Dict[str, Any]:
+            store = MarketStore(os.path.join(tmp, f"cold{next(n)}.sqlite"))
+            try:
+                return load_workbooks(files, jobs=1, store=store)[0]
+            finally:
+                store.close()
+
+        stage("store_cold", cold, lambda d: len(d["markets"]))
+        store = MarketStore(os.path.join(tmp, "warm.sqlite"))
+        load_workbooks(files, jobs=1, store=store)
+        stage("store_warm", lambda: load_workbooks(files, jobs=1, store=store)[0], lambda d: len(d["markets"]))
+        store.close()
+
+    return stages
+
+
+# frischer Interpreter: erster Lauf der App ohne Upload (Kaltstart) + beste Zeit aus 5 Reruns
+STARTUP_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+t0 = time.perf_counter()
+at.run()
+cold = time.perf_counter() - t0
+reruns = []
+for _ in range(5):
+    t0 = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - t0)
+print(json.dumps({"cold_seconds": cold, "rerun_seconds": min(reruns),
+                  "pandas_loaded": "pandas" in sys.modules, "openpyxl_loaded": "openpyxl" in sys.modules}))
+"""
+
+
+def bench_startup(runs: int = 3) -> Dict[str, Any]:
+    """Kaltstart und Rerun von quell.py ohne Upload (Streamlit AppTest, je Lauf ein neuer Prozess)."""
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quell.py")
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, app], capture_output=True, text=True, check=True
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "cold_seconds": round(min(r["cold_seconds"] for r in results), 4),
+        "rerun_seconds": round(min(r["rerun_seconds"] for r in results), 4),
+        "pandas_loaded": results[-1]["pandas_loaded"],
+        "openpyxl_loaded": results[-1]["openpyxl_loaded"],
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark für quell.py (synthetische Mappen)")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="Anzahl Märkte je Lauf")
+    p.add_argument("--tours", type=int, default=300, help="Anzahl verschiedener Tournummern")
+    p.add_argument("--tour-skew", type=float, default=1.0, help="Verteilung der Touren (0 = gleichverteilt)")
+    p.add_argument("--blank-ratio", type=float, default=0.02, help="Anteil leerer Zeilen")
+    p.add_argument("--extra-cols", type=int, default=0, help="zusätzliche Spalten hinter L")
+    p.add_argument("--repeat", type=int, default=1, help="Wiederholungen je Stufe (beste Zeit zählt)")
+    p.add_argument("--no-memory", action="store_true", help="Spitzen-Speicher nicht messen")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--workdir", default=None, help="Verzeichnis für die erzeugten Mappen (Standard: temporär)")
+    p.add_argument("--keep", action="store_true", help="erzeugte Mappen behalten")
+    p.add_argument("--startup", action="store_true", help="zusätzlich Kaltstart/Rerun der App messen")
+    p.add_argument("--out", default="benchmark.json", help="Ergebnisdatei (JSON)")
+    args = p.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="quell-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    runs: List[Dict[str, Any]] = []
+    for n in args.sizes:
+        path = os.path.join(workdir, f"direkt_{n}.xlsx")
+        t0 = time.perf_counter()
+        rows = write_workbook(
+            path,
+            n,
+            tours=args.tours,
+            tour_skew=args.tour_skew,
+            blank_ratio=args.blank_ratio,
+            extra_cols=args.extra_cols,
+            seed=args.seed,
+        )
+        gen_seconds = time.perf_counter() - t0
+
+        stages = bench_file(path, args.repeat, not args.no_memory)
+        runs.append(
+            {
+                "markets": n,
+                "rows": rows,
+                "file_bytes": os.path.getsize(path),
+                "generate_seconds": round(gen_seconds, 4),
+                "stages": stages,
+            }
+        )
+        print(f"{n:>8} Märkte: " + ", ".join(f"{k} {v['seconds']:.3f}s" for k, v in stages.items()), file=sys.stderr)
+
+        if not args.keep:
+            os.remove(path)
+
+    startup = None
+    if args.startup:
+        startup = bench_startup()
+        print(f"Start: kalt {startup['cold_seconds']:.3f}s, Rerun {startup['rerun_seconds']:.4f}s", file=sys.stderr)
+
+    result = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "openpyxl": openpyxl.__version__,
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "workdir", "keep")},
+        "startup": startup,
+        "runs": runs,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"Ergebnis: {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
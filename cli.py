@@ -0,0 +1,222 @@
+# cli.py
+# Kommandozeile: viele Mappen -> je eine interaktive HTML, parallel über alle Kerne (ohne Streamlit)
+#
+#   python cli.py depots/ -o out/
+#   python cli.py "depots/**/*.xlsx" --gzip -j 8
+#   python cli.py depots/ --shards          # je Mappe ein ZIP: index.html + ein Shard je Tour
+#   python cli.py depots/ --plan 2026-01-01 2026-12-31 --land NW   # zusätzlich <Name>_plan.csv
+#   python cli.py depots/ --plan 2026-12-21 --holidays 2026-12-24 2026-12-31
+#
+# Eingaben: Dateien, Verzeichnisse (*.xlsx, *.xlsm, *.xls) oder Glob-Muster.
+# Fehler je Datei werden gemeldet, die übrigen Dateien laufen weiter (Exit-Code 1, wenn etwas fehlschlug).
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from export import write_plan_csv, write_plan_xlsx
+from feiertage import BUNDESLAENDER
+from ingest import SHEET_NAME, load_data
+from render import write_html, write_shards_zip
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xls")
+
+
+def collect_inputs(patterns: List[str]) -> List[str]:
+    """Dateien, Verzeichnisse und Glob-Muster -> sortierte, eindeutige Liste von Mappen."""
+    found: List[str] = []
+    for p in patterns:
+        if os.path.isdir(p):
+            found.extend(
+                os.path.join(p, f) for f in sorted(os.listdir(p)) if f.lower().endswith(EXCEL_EXTENSIONS)
+            )
+        elif glob.has_magic(p):
+            found.extend(f for f in sorted(glob.glob(p, recursive=True)) if f.lower().endswith(EXCEL_EXTENSIONS))
+        else:
+            found.append(p)
+
+    # Excel-Sperrdateien (~$…) auslassen, Duplikate entfernen
+    seen = set()
+    out = []
+    for f in found:
+        key = os.path.abspath(f)
+        if os.path.basename(f).startswith("~$") or key in seen:
+            continue
+        seen.add(key)
+        out.append(f)
+    return out
+
+
+def output_paths(inputs: List[str], out_dir: str, ext: str = ".html") -> List[str]:
+    """Ziel je Mappe: <Name>.html (bzw. ext); gleiche Namen aus verschiedenen Verzeichnissen bekommen _2, _3, …"""
+    used: Dict[str, int] = {}
+    out = []
+    for f in inputs:
+        stem = os.path.splitext(os.path.basename(f))[0]
+        n = used.get(stem, 0) + 1
+        used[stem] = n
+        out.append(os.path.join(out_dir, f"{stem}{ext}" if n == 1 else f"{stem}_{n}{ext}"))
+    return out
+
+
+def convert(
+    path: str,
+    out_path: str,
+    sheet_name: str = SHEET_NAME,
+    compress: bool = False,
+    shards: bool = False,
+    plan: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Eine Mappe -> HTML-Datei (bzw. ZIP je Tour). Läuft im Worker-Prozess; Fehler kommen als "error" zurück.
+    plan: {start, end, bundesland, holidays, tour_together, format} -> zusätzlich <Ziel>_plan.csv/.xlsx
+    """
+    t0 = time.perf_counter()
+    result: Dict[str, Any] = {"file": path, "out": out_path, "markets": 0, "bytes": 0, "error": None}
+    try:
+        data = load_data(path, path, sheet_name)
+        # direkt in die Datei streamen, ohne die HTML im Speicher aufzubauen
+        with open(out_path, "wb") as f:
+            if shards:
+                write_shards_zip(data, f)
+            else:
+                write_html(data, f, compress=compress)
+            result["bytes"] = f.tell()
+        result["markets"] = len(data["markets"])
+
+        if plan is not None:
+            plan_path = f"{os.path.splitext(out_path)[0]}_plan.{plan['format']}"
+            args = (plan["start"], plan["end"], plan["bundesland"], plan["holidays"], plan["tour_together"])
+            if plan["format"] == "xlsx":
+                result["plan_rows"] = write_plan_xlsx(data, plan_path, *args)
+            else:
+                with open(plan_path, "w", encoding="utf-8-sig", newline="") as f:
+                    result["plan_rows"] = write_plan_csv(data, f, *args)
+            result["plan"] = plan_path
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - t0, 4)
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Excel-Mappen -> interaktive HTML (Stapelverarbeitung)")
+    p.add_argument("inputs", nargs="+", help="Dateien, Verzeichnisse oder Glob-Muster")
+    p.add_argument("-o", "--out-dir", default=".", help="Zielverzeichnis für die HTML-Dateien")
+    p.add_argument("-s", "--sheet", default=SHEET_NAME, help=f"Blattname (Standard: {SHEET_NAME})")
+    variant = p.add_mutually_exclusive_group()
+    variant.add_argument("--gzip", action="store_true", help="Datenblock komprimiert (gzip, entpackt im Browser)")
+    variant.add_argument(
+        "--shards", action="store_true", help="ZIP je Mappe: index.html + ein Shard je Tour (ohne --gzip)"
+    )
+    p.add_argument(
+        "--plan",
+        nargs="+",
+        metavar="DATUM",
+        default=None,
+        help="zusätzlich den Plan exportieren: eine KW (ein Datum) oder Zeitraum VON BIS (ISO-Daten)",
+    )
+    p.add_argument(
+        "--land",
+        default=None,
+        help=f"Bundesland für gesetzliche Feiertage im Plan ({', '.join(BUNDESLAENDER)}; ohne: nur bundesweite)",
+    )
+    p.add_argument(
+        "--holidays", nargs="+", metavar="DATUM", default=[], help="zusätzliche Feiertage im Plan (ISO-Daten)"
+    )
+    p.add_argument("--plan-format", choices=("csv", "xlsx"), default="csv", help="Format des Plans (Standard: csv)")
+    p.add_argument("--tour-together", action="store_true", help="im Plan Touren zusammenhalten")
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Anzahl Prozesse (Standard: alle Kerne)")
+    p.add_argument("--report", default=None, help="Ergebnis je Datei + Zusammenfassung als JSON schreiben")
+    args = p.parse_args(argv)
+
+    # Plan-Angaben hier prüfen, nicht erst je Datei im Worker
+    plan = None
+    if args.plan is not None:
+        if len(args.plan) > 2:
+            p.error("--plan erwartet ein Datum oder VON BIS")
+        try:
+            days = [date.fromisoformat(d) for d in args.plan]
+            holidays = [date.fromisoformat(d) for d in args.holidays]
+        except ValueError as e:
+            p.error(f"ungültiges Datum ({e}), erwartet JJJJ-MM-TT")
+        if len(days) == 2 and days[1] < days[0]:
+            p.error("--plan: BIS liegt vor VON")
+        land = args.land.upper() if args.land else None
+        if land is not None and land not in BUNDESLAENDER:
+            p.error(f"--land: unbekanntes Bundesland „{args.land}“ (erlaubt: {', '.join(BUNDESLAENDER)})")
+        plan = {
+            "start": days[0],
+            "end": days[1] if len(days) == 2 else None,
+            "bundesland": land,
+            "holidays": holidays,
+            "tour_together": args.tour_together,
+            "format": args.plan_format,
+        }
+    elif args.land or args.holidays or args.tour_together:
+        p.error("--land, --holidays und --tour-together gelten nur mit --plan")
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("Keine Excel-Dateien gefunden.", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    outs = output_paths(inputs, args.out_dir, ".zip" if args.shards else ".html")
+    jobs = max(1, min(args.jobs, len(inputs)))
+
+    t0 = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(convert, f, o, args.sheet, args.gzip, args.shards, plan) for f, o in zip(inputs, outs)]
+        for fut in as_completed(futures):
+            r = fut.result()
+            results.append(r)
+            if r["error"]:
+                print(f"FEHLER {r['file']}: {r['error']}", file=sys.stderr)
+            else:
+                plan_info = f", Plan {r['plan']} ({r['plan_rows']} Zeilen)" if r.get("plan") else ""
+                print(
+                    f"ok     {r['file']} -> {r['out']} ({r['markets']} Märkte{plan_info}, {r['seconds']:.2f} s)",
+                    file=sys.stderr,
+                )
+    wall = time.perf_counter() - t0
+
+    ok = [r for r in results if not r["error"]]
+    markets = sum(r["markets"] for r in ok)
+    summary = {
+        "files": len(results),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "jobs": jobs,
+        "seconds": round(wall, 3),
+        "markets": markets,
+        "bytes": sum(r["bytes"] for r in ok),
+        "files_per_second": round(len(ok) / wall, 2) if wall else None,
+        "markets_per_second": round(markets / wall) if wall else None,
+    }
+    print(
+        f"\n{summary['ok']}/{summary['files']} Dateien in {wall:.2f} s mit {jobs} Prozessen "
+        f"({summary['files_per_second']} Dateien/s, {summary['markets_per_second']} Märkte/s, "
+        f"{summary['bytes'] / 1024 ** 2:,.1f} MB {'ZIP' if args.shards else 'HTML'})"
+        + (f", {summary['failed']} fehlgeschlagen" if summary["failed"] else ""),
+        file=sys.stderr,
+    )
+
+    if args.report:
+        order = {f: i for i, f in enumerate(inputs)}
+        results.sort(key=lambda r: order[r["file"]])
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "files": results}, f, ensure_ascii=False, indent=2)
+
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# export.py
+# Berechneter Plan -> CSV / XLSX für Excel und TMS: eine Zeile je Markt und Liefertag
+#
+#   KW_Beginn | CSB | SAP | Markt | Ort | Tour | Datum_Original | Datum_Ziel | Verschoben | Konflikt
+#
+# Die Zeilen kommen einzeln aus planner.iter_plan_rows und werden sofort geschrieben (csv.writer bzw.
+# openpyxl write-only): der Speicher wächst weder mit der Zahl der Märkte noch mit der Länge des Zeitraums.
+# Konflikt = 1: Lieferung fällt auf einen Feiertag und war nicht verschiebbar (Datum_Ziel leer).
+
+import csv
+from datetime import date
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, TextIO, Tuple, Union
+
+from planner import DateLike, iter_plan_rows
+
+EXPORT_COLUMNS = (
+    "KW_Beginn",
+    "CSB",
+    "SAP",
+    "Markt",
+    "Ort",
+    "Tour",
+    "Datum_Original",
+    "Datum_Ziel",
+    "Verschoben",
+    "Konflikt",
+)
+
+# Zeilen je Excel-Blatt (inkl. Kopfzeile)
+XLSX_MAX_ROWS = 1_048_576
+
+
+def export_rows(
+    data: Dict[str, Any],
+    start: DateLike,
+    end: Optional[DateLike] = None,
+    bundesland: Optional[str] = None,
+    holidays: Iterable[DateLike] = (),
+    tour_together: bool = False,
+) -> Iterator[Tuple[Any, ...]]:
+    """Zeilen wie EXPORT_COLUMNS (Daten als date, Datum_Ziel None bei Konflikt)."""
+    markets = data["markets"]
+    for ws, mid, tour, orig, target in iter_plan_rows(data, start, end, bundesland, holidays, tour_together):
+        m = markets[mid]
+        yield (
+            ws,
+            m.csb,
+            m.sap,
+            m.name,
+            m.city,
+            tour,
+            orig,
+            target,
+            int(target is not None and target != orig),
+            int(target is None),
+        )
+
+
+def write_plan_csv(
+    data: Dict[str, Any],
+    out: TextIO,
+    start: DateLike,
+    end: Optional[DateLike] = None,
+    bundesland: Optional[str] = None,
+    holidays: Iterable[DateLike] = (),
+    tour_together: bool = False,
+    delimiter: str = ";",
+) -> int:
+    """
+    Plan als CSV in out (Textdatei mit newline=""): Semikolon, ISO-Daten, Flags 0/1.
+    Rückgabe: Anzahl Zeilen ohne Kopfzeile.
+    """
+    w = csv.writer(out, delimiter=delimiter)
+    w.writerow(EXPORT_COLUMNS)
+    n = 0
+    for row in export_rows(data, start, end, bundesland, holidays, tour_together):
+        target = row[7]
+        w.writerow(row[:6] + (row[6].isoformat(), target.isoformat() if target else "") + row[8:])
+        n += 1
+    return n
+
+
+def write_plan_xlsx(
+    data: Dict[str, Any],
+    out: Union[str, BinaryIO],
+    start: DateLike,
+    end: Optional[DateLike] = None,
+    bundesland: Optional[str] = None,
+    holidays: Iterable[DateLike] = (),
+    tour_together: bool = False,
+) -> int:
+    """
+    Plan als Excel-Mappe (Blatt "Plan", openpyxl write-only: Zeilen gehen direkt in eine temporäre
+    Datei). Mehr Zeilen als ein Blatt fasst -> ValueError (dann CSV verwenden).
+    Rückgabe: Anzahl Zeilen ohne Kopfzeile.
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Plan")
+    ws.append(EXPORT_COLUMNS)
+
+    def day(v: Optional[date]) -> Any:
+        if v is None:
+            return None
+        c = WriteOnlyCell(ws, v)
+        c.number_format = "DD.MM.YYYY"
+        return c
+
+    n = 0
+    for row in export_rows(data, start, end, bundesland, holidays, tour_together):
+        n += 1
+        if n >= XLSX_MAX_ROWS:
+            raise ValueError(f"Plan hat mehr als {XLSX_MAX_ROWS - 1:,} Zeilen – für Excel zu groß, bitte CSV verwenden.")
+        ws.append((day(row[0]),) + row[1:6] + (day(row[6]), day(row[7])) + row[8:])
+
+    wb.save(out)
+    return n
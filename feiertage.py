@@ -0,0 +1,119 @@
+# feiertage.py
+# Gesetzliche Feiertage in Deutschland je Bundesland (inkl. beweglicher Feiertage ab Ostern).
+#
+# Bundesweit: Neujahr, Karfreitag, Ostermontag, Tag der Arbeit, Christi Himmelfahrt,
+# Pfingstmontag, Tag der Deutschen Einheit, 1. und 2. Weihnachtstag.
+# Dazu die landesweiten Feiertage laut BUNDESLAND_FEIERTAGE (nur landesweit gültige,
+# keine Feiertage einzelner Gemeinden wie Mariä Himmelfahrt in Teilen Bayerns).
+
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+BUNDESLAENDER = {
+    "BW": "Baden-Württemberg",
+    "BY": "Bayern",
+    "BE": "Berlin",
+    "BB": "Brandenburg",
+    "HB": "Bremen",
+    "HH": "Hamburg",
+    "HE": "Hessen",
+    "MV": "Mecklenburg-Vorpommern",
+    "NI": "Niedersachsen",
+    "NW": "Nordrhein-Westfalen",
+    "RP": "Rheinland-Pfalz",
+    "SL": "Saarland",
+    "SN": "Sachsen",
+    "ST": "Sachsen-Anhalt",
+    "SH": "Schleswig-Holstein",
+    "TH": "Thüringen",
+}
+
+# Feiertag -> {Bundesland: erstes Jahr}
+BUNDESLAND_FEIERTAGE = {
+    "Heilige Drei Könige": {"BW": 0, "BY": 0, "ST": 0},
+    "Internationaler Frauentag": {"BE": 2019, "MV": 2023},
+    "Ostersonntag": {"BB": 0},
+    "Pfingstsonntag": {"BB": 0},
+    "Fronleichnam": {"BW": 0, "BY": 0, "HE": 0, "NW": 0, "RP": 0, "SL": 0},
+    "Mariä Himmelfahrt": {"SL": 0},
+    "Weltkindertag": {"TH": 2019},
+    "Reformationstag": {
+        "BB": 0, "MV": 0, "SN": 0, "ST": 0, "TH": 0,
+        "HB": 2018, "HH": 2018, "NI": 2018, "SH": 2018,
+    },
+    "Allerheiligen": {"BW": 0, "BY": 0, "NW": 0, "RP": 0, "SL": 0},
+    "Buß- und Bettag": {"SN": 0},
+}
+
+
+def easter_sunday(year: int) -> date:
+    # Gaußsche Osterformel (gregorianisch, anonymer Algorithmus)
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def holidays(year: int, bundesland: Optional[str] = None) -> Dict[date, str]:
+    """
+    Feiertage eines Jahres: Datum -> Name.
+    Ohne Bundesland nur die bundesweiten Feiertage.
+    """
+    if bundesland is not None and bundesland not in BUNDESLAENDER:
+        raise ValueError(f"Unbekanntes Bundesland: {bundesland} (erlaubt: {', '.join(BUNDESLAENDER)})")
+
+    easter = easter_sunday(year)
+    nov23 = date(year, 11, 23)
+
+    out = {
+        date(year, 1, 1): "Neujahr",
+        easter - timedelta(days=2): "Karfreitag",
+        easter + timedelta(days=1): "Ostermontag",
+        date(year, 5, 1): "Tag der Arbeit",
+        easter + timedelta(days=39): "Christi Himmelfahrt",
+        easter + timedelta(days=50): "Pfingstmontag",
+        date(year, 10, 3): "Tag der Deutschen Einheit",
+        date(year, 12, 25): "1. Weihnachtstag",
+        date(year, 12, 26): "2. Weihnachtstag",
+    }
+    if year == 2017:
+        # 500 Jahre Reformation: einmalig bundesweit
+        out[date(2017, 10, 31)] = "Reformationstag"
+
+    if bundesland is None:
+        return out
+
+    regional = {
+        "Heilige Drei Könige": date(year, 1, 6),
+        "Internationaler Frauentag": date(year, 3, 8),
+        "Ostersonntag": easter,
+        "Pfingstsonntag": easter + timedelta(days=49),
+        "Fronleichnam": easter + timedelta(days=60),
+        "Mariä Himmelfahrt": date(year, 8, 15),
+        "Weltkindertag": date(year, 9, 20),
+        "Reformationstag": date(year, 10, 31),
+        "Allerheiligen": date(year, 11, 1),
+        # Mittwoch vor dem 23. November
+        "Buß- und Bettag": nov23 - timedelta(days=(nov23.weekday() - 2) % 7 or 7),
+    }
+    for name, d in regional.items():
+        since = BUNDESLAND_FEIERTAGE[name].get(bundesland)
+        if since is not None and year >= since:
+            out[d] = name
+
+    return dict(sorted(out.items()))
+
+
+def holidays_between(start: date, end: date, bundesland: Optional[str] = None) -> Dict[date, str]:
+    """Feiertage im Zeitraum start..end (jeweils einschließlich)."""
+    out: Dict[date, str] = {}
+    for year in range(start.year, end.year + 1):
+        out.update({d: n for d, n in holidays(year, bundesland).items() if start <= d <= end})
+    return out
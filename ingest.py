@@ -0,0 +1,465 @@
+# ingest.py
+# Excel -> Daten (build_data): Blatt "Direkt 1 - 99", Spalten A–L
+# A CSB | B SAP | C Marktname | D Straße | E PLZ | F Ort | G–L Mo–Sa (Tournummern)
+#
+# Ohne Streamlit, damit App (quell.py), CLI (cli.py) und Benchmark dieselbe Einlese-Logik nutzen.
+# pandas und openpyxl werden erst geladen, wenn tatsächlich eine Mappe gelesen wird.
+
+import contextlib
+import fnmatch
+import hashlib
+import io
+import os
+import sys
+import time
+from typing import (
+    TYPE_CHECKING,
+    AbstractSet,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from planner import DAY_KEYS
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    import pandas as pd
+
+    from store import MarketStore
+
+SHEET_NAME = "Direkt 1 - 99"
+
+
+class Market(NamedTuple):
+    """
+    Ein Markt (Zeile A–L). Tupel statt dict mit verschachteltem pattern-dict: bei 100k Märkten
+    ein Bruchteil des Speichers. PLZ, Ort und Touren sind interniert (gleicher Wert = ein Objekt).
+    Erst render/objects_json_size machen daraus JSON.
+    """
+
+    csb: str
+    sap: str
+    name: str
+    street: str
+    zip: str
+    city: str
+    pattern: Tuple[str, ...]  # Tournummern Mo–Sa (DAY_KEYS), "" = keine Lieferung
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Objektformat {csb, …, city, pattern: {mo: …, …, sa: …}}."""
+        d = self._asdict()
+        d["pattern"] = dict(zip(DAY_KEYS, self.pattern))
+        return d
+
+
+def make_market(csb: str, sap: str, name: str, street: str, zipc: str, city: str, tours: Iterable[str]) -> Market:
+    intern = sys.intern
+    return Market(csb, sap, name, street, intern(zipc), intern(city), tuple(intern(t) for t in tours))
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+def _isna(x: Any) -> bool:
+    # wie pd.isna für Einzelwerte; pandas-eigene Werte (pd.NA, NaT) gibt es nur, wenn pandas geladen ist
+    if x is None:
+        return True
+    if isinstance(x, (str, int)):
+        return False
+    if isinstance(x, float):
+        return x != x
+    pd = sys.modules.get("pandas")
+    return pd is not None and bool(pd.isna(x))
+
+
+def norm_str(x: Any) -> str:
+    if _isna(x):
+        return ""
+    return str(x).strip()
+
+
+def norm_tour(x: Any) -> str:
+    if _isna(x):
+        return ""
+    s = str(x).strip()
+    # häufig: 1201.0 -> 1201
+    if s.endswith(".0"):
+        s = s[:-2]
+    return s
+
+
+def norm_str_col(col: "pd.Series") -> "pd.Series":
+    """Spaltenweise Variante von norm_str (NaN -> "", sonst str + strip)."""
+    return col.astype(object).where(col.notna(), "").astype(str).str.strip()
+
+
+def norm_tour_col(col: "pd.Series") -> "pd.Series":
+    """Spaltenweise Variante von norm_tour (1201.0 -> 1201)."""
+    return norm_str_col(col).str.replace(r"\.0$", "", regex=True)
+
+
+def iter_sheet_rows(source: Any, sheet_name: str = SHEET_NAME) -> Iterator[Sequence[Any]]:
+    """
+    Streamt die Zeilen eines Blatts im openpyxl read-only Modus.
+    Es werden nur die Werte der Spalten A–L gelesen, kein DataFrame aufgebaut.
+    Die Mappe wird sofort geöffnet (Lesefehler hier), die Zeilen erst beim Iterieren gelesen.
+
+    Die Größenangabe im Blatt (<dimension>) ist oft falsch und wird ignoriert. Die Breite ergibt
+    sich wie bei pd.read_excel aus den belegten Zellen; ist Spalte L nie belegt, folgt der
+    ValueError nach der letzten Zeile.
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name]
+        ws.reset_dimensions()
+    except Exception:
+        wb.close()
+        raise
+
+    def rows() -> Iterator[Sequence[Any]]:
+        width = 0
+        try:
+            for r in ws.iter_rows(min_col=1, max_col=12, values_only=True):
+                if width < 12:
+                    width = max([width] + [i + 1 for i, v in enumerate(r) if v is not None])
+                yield r
+        finally:
+            wb.close()
+        if width < 12:
+            raise ValueError("Excel-Blatt hat weniger als 12 Spalten (A–L).")
+
+    return rows()
+
+
+def row_hash(r: Sequence[Any]) -> str:
+    """Inhalts-Hash einer Rohzeile (A–L auf 12 Werte aufgefüllt, vor der Normalisierung)."""
+    return hashlib.blake2b(repr(tuple(r)).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _market_from_row(r: Sequence[Any]) -> Optional[Market]:
+    # r: 12 Rohwerte; None, wenn weder CSB, SAP noch Name gesetzt sind
+    csb, sap, name, street, zipc, city = (norm_str(v) for v in r[:6])
+
+    if not (csb or sap or name):
+        return None
+
+    return make_market(csb, sap, name, street, zipc, city, (norm_tour(v) for v in r[6:12]))
+
+
+def _markets_from_rows(rows: Iterable[Sequence[Any]]) -> List[Market]:
+    markets: List[Market] = []
+
+    for r in rows:
+        m = _market_from_row(tuple(r) + (None,) * (12 - len(r)))
+        if m is not None:
+            markets.append(m)
+
+    return markets
+
+
+def _hashed_markets_from_rows(
+    rows: Iterable[Sequence[Any]], known: AbstractSet[str]
+) -> Tuple[List[Optional[Market]], List[str]]:
+    """
+    Wie _markets_from_rows, dazu der Zeilen-Hash je Markt. Zeilen mit bekanntem Hash werden nicht
+    normalisiert; ihr Markt ist None und kommt aus dem Speicher (store.MarketStore.records).
+    """
+    markets: List[Optional[Market]] = []
+    hashes: List[str] = []
+
+    for r in rows:
+        r = tuple(r[:12]) + (None,) * (12 - len(r))
+        h = row_hash(r)
+        if h in known:
+            markets.append(None)
+        else:
+            m = _market_from_row(r)
+            if m is None:
+                continue
+            markets.append(m)
+        hashes.append(h)
+
+    return markets, hashes
+
+
+def _markets_from_frame(df: "pd.DataFrame") -> List[Market]:
+    if df.shape[1] < 12:
+        raise ValueError("Excel-Blatt hat weniger als 12 Spalten (A–L).")
+
+    info = [norm_str_col(df.iloc[:, i]) for i in range(6)]
+    tours = [norm_tour_col(df.iloc[:, 6 + i]) for i in range(6)]
+
+    # Zeile nur behalten, wenn CSB, SAP oder Name gesetzt ist
+    keep = (info[0] != "") | (info[1] != "") | (info[2] != "")
+    csb, sap, name, street, zipc, city = (c[keep].tolist() for c in info)
+    tour_cols = [c[keep].tolist() for c in tours]
+
+    return [
+        make_market(csb[i], sap[i], name[i], street[i], zipc[i], city[i], (c[i] for c in tour_cols))
+        for i in range(len(csb))
+    ]
+
+
+def build_data(source: Union["pd.DataFrame", Iterable[Sequence[Any]]]) -> Dict[str, Any]:
+    """
+    Liest ALLE Zeilen aus dem Excel-Blatt ein (Märkte als Market-Tupel).
+    Leere Zeilen werden übersprungen.
+    Quelle: DataFrame (spaltenweise Normalisierung) oder Zeilen-Iterator (iter_sheet_rows).
+    """
+    # ohne geladenes pandas kann source kein DataFrame sein
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(source, pd.DataFrame):
+        markets = _markets_from_frame(source)
+    else:
+        markets = _markets_from_rows(source)
+
+    return {
+        "meta": {
+            # feste Logik: Woche beginnt Sonntag (So–Sa)
+            "weekStartsSunday": True,
+            "minGapDays": 3,
+        },
+        "markets": markets,
+    }
+
+
+def load_data(source: Any, file_name: str, sheet_name: str = SHEET_NAME) -> Dict[str, Any]:
+    """
+    Mappe -> build_data() in einem Schritt.
+    .xlsx/.xlsm: Zeilen streamen (read-only, nur A–L); .xls nur über pandas.
+    """
+    if file_name.lower().endswith(".xls"):
+        import pandas as pd
+
+        return build_data(pd.read_excel(source, sheet_name=sheet_name, header=None))
+    return build_data(iter_sheet_rows(source, sheet_name))
+
+
+# ----------------------------
+# Mehrere Blätter / Mappen
+# ----------------------------
+def list_sheets(source: Any, file_name: str) -> List[str]:
+    if file_name.lower().endswith(".xls"):
+        import pandas as pd
+
+        return list(pd.ExcelFile(source).sheet_names)
+
+    # Namen direkt aus xl/workbook.xml: openpyxl liest beim Öffnen ggf. das ganze Blatt (Dimensionen)
+    import zipfile
+    from xml.etree import ElementTree
+
+    try:
+        with zipfile.ZipFile(source) as z:
+            root = ElementTree.fromstring(z.read("xl/workbook.xml"))
+        return [e.get("name") for e in root.iter() if e.tag.rsplit("}", 1)[-1] == "sheet"]
+    except (KeyError, zipfile.BadZipFile, ElementTree.ParseError):
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+    import openpyxl
+
+    wb = openpyxl.load_workbook(source, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def match_sheets(names: Sequence[str], pattern: str) -> List[str]:
+    """Exakter Blattname oder Muster mit * ? [...] (Groß-/Kleinschreibung egal), Reihenfolge wie in der Mappe."""
+    if pattern in names:
+        return [pattern]
+    pat = pattern.lower()
+    return [n for n in names if fnmatch.fnmatchcase(n.lower(), pat)]
+
+
+def read_sheet(
+    raw: Union[bytes, str], file_name: str, sheet_name: str, known: Optional[AbstractSet[str]] = None
+) -> Dict[str, Any]:
+    """
+    Ein Blatt -> Märkte + Messwerte. Läuft im Worker-Prozess, daher nur Bytes/Strings als Argumente;
+    raw: Inhalt der Mappe oder Pfad einer temporären Kopie (load_workbooks mit Prozessen).
+    Mit known (Zeilen-Hashes aus dem Speicher) zusätzlich "hashes"; Märkte bekannter Zeilen sind None.
+    Rückgabe: {file, sheet, rows, markets, seconds} (+ hashes, reused)
+    """
+    t0 = time.perf_counter()
+    source = io.BytesIO(raw) if isinstance(raw, bytes) else raw
+    rows = 0
+    result: Dict[str, Any] = {"file": file_name, "sheet": sheet_name}
+
+    if file_name.lower().endswith(".xls"):
+        import pandas as pd
+
+        df = pd.read_excel(source, sheet_name=sheet_name, header=None)
+        rows = len(df)
+        if known is None:
+            markets = build_data(df)["markets"]
+        else:
+            if df.shape[1] < 12:
+                raise ValueError("Excel-Blatt hat weniger als 12 Spalten (A–L).")
+            markets, result["hashes"] = _hashed_markets_from_rows(df.itertuples(index=False, name=None), known)
+    else:
+
+        def counted(it: Iterable[Sequence[Any]]) -> Iterator[Sequence[Any]]:
+            nonlocal rows
+            for r in it:
+                rows += 1
+                yield r
+
+        it = counted(iter_sheet_rows(source, sheet_name))
+        if known is None:
+            markets = build_data(it)["markets"]
+        else:
+            markets, result["hashes"] = _hashed_markets_from_rows(it, known)
+
+    if known is not None:
+        result["reused"] = sum(m is None for m in markets)
+    result.update(rows=rows, markets=markets, seconds=round(time.perf_counter() - t0, 4))
+    return result
+
+
+def merge_markets(parts: Iterable[List[Market]]) -> Tuple[List[Market], int]:
+    """
+    Märkte mehrerer Blätter zusammenführen. Ein Markt gilt als doppelt, wenn seine CSB oder SAP
+    (jeweils nicht leer) schon vorkam; der erste Eintrag (Datei-/Blattreihenfolge) gewinnt.
+    Rückgabe: (Märkte, Anzahl entfernter Duplikate)
+    """
+    seen_csb: Set[str] = set()
+    seen_sap: Set[str] = set()
+    markets: List[Market] = []
+    duplicates = 0
+
+    for part in parts:
+        for m in part:
+            csb, sap = m.csb, m.sap
+            if (csb and csb in seen_csb) or (sap and sap in seen_sap):
+                duplicates += 1
+                continue
+            if csb:
+                seen_csb.add(csb)
+            if sap:
+                seen_sap.add(sap)
+            markets.append(m)
+
+    return markets, duplicates
+
+
+def load_workbooks(
+    files: Sequence[Tuple[str, bytes]],
+    sheet_pattern: str = SHEET_NAME,
+    jobs: Optional[int] = None,
+    store: Optional["MarketStore"] = None,
+    pool: Optional["Executor"] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Mehrere Mappen (Name, Bytes) -> ein Datensatz wie build_data().
+    Alle Blätter, die zu sheet_pattern passen, werden parallel in Worker-Prozessen gelesen
+    (ein Blatt je Aufgabe, höchstens jobs bzw. alle Kerne) und über merge_markets zusammengeführt.
+    pool: vorhandener Prozess-Pool (z. B. einer je App-Prozess); sonst ein eigener für diesen Aufruf.
+    Die Worker bekommen je Mappe den Pfad einer temporären Kopie statt der Bytes je Blatt.
+
+    Mit store (store.MarketStore): unveränderte Blätter kommen ohne Excel-Lesen aus dem Speicher,
+    in den übrigen werden nur neue Zeilen normalisiert (bekannt: frühere Stände desselben Blatts);
+    info["delta"] vergleicht mit dem letzten Bestand desselben Uploads (Dateinamen + Blattmuster).
+
+    Rückgabe: (data, info) mit info = {sheets: [{file, sheet, rows, markets, seconds, …}], duplicates, jobs, delta}
+    """
+    tasks: List[Tuple[bytes, str, str]] = []
+    sources: List[str] = []
+    for name, raw in files:
+        sheets = match_sheets(list_sheets(io.BytesIO(raw), name), sheet_pattern)
+        if not sheets:
+            raise ValueError(f"{name}: kein Blatt passt zu „{sheet_pattern}“.")
+        tasks.extend((raw, name, s) for s in sheets)
+        if store is not None:
+            from store import sheet_source, workbook_fingerprint
+
+            fp = workbook_fingerprint(raw, name)
+            sources.extend(sheet_source(fp, s) for s in sheets)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+    if store is not None:
+        for i, (_, name, sheet) in enumerate(tasks):
+            t0 = time.perf_counter()
+            hit = store.load_sheet(sources[i])
+            if hit is not None:
+                markets, hashes, rows = hit
+                results[i] = {
+                    "file": name,
+                    "sheet": sheet,
+                    "rows": rows,
+                    "markets": markets,
+                    "hashes": hashes,
+                    "reused": len(markets),
+                    "stored": True,
+                    "seconds": round(time.perf_counter() - t0, 4),
+                }
+
+    pending = [i for i, r in enumerate(results) if r is None]
+    # je Aufgabe nur die Hashes ihres Blatts, damit nicht der ganze Speicher zu jedem Worker geht
+    known: List[Optional[AbstractSet[str]]] = [
+        frozenset(store.known_hashes(tasks[i][1], tasks[i][2])) if store is not None else None for i in pending
+    ]
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(pending) or 1))
+    if jobs == 1:
+        for i, k in zip(pending, known):
+            results[i] = read_sheet(*tasks[i], k)
+    else:
+        import tempfile
+        from concurrent.futures import ProcessPoolExecutor
+
+        with tempfile.TemporaryDirectory(prefix="quell-ingest-") as tmp, contextlib.ExitStack() as stack:
+            # jede Mappe einmal auf die Platte statt einmal je Blatt in die Aufgabe
+            paths: Dict[int, str] = {}
+            for raw, name, _ in (tasks[i] for i in pending):
+                if id(raw) not in paths:
+                    paths[id(raw)] = os.path.join(tmp, f"{len(paths)}{os.path.splitext(name)[1]}")
+                    with open(paths[id(raw)], "wb") as f:
+                        f.write(raw)
+            if pool is None:
+                pool = stack.enter_context(ProcessPoolExecutor(max_workers=jobs))
+            args = [(paths[id(tasks[i][0])], tasks[i][1], tasks[i][2]) for i in pending]
+            # map liefert in Aufgabenreihenfolge -> Zusammenführung unabhängig von der Laufzeit
+            done = pool.map(read_sheet, *zip(*args), known)
+            for i, r in zip(pending, done):
+                results[i] = r
+
+    if store is not None:
+        for i in pending:
+            r = results[i]
+            missing = [h for h, m in zip(r["hashes"], r["markets"]) if m is None]
+            if missing:
+                found = store.records(missing)
+                if len(found) < len(set(missing)):
+                    # inzwischen von einer anderen Session aufgeräumt: Blatt vollständig normalisieren
+                    r = results[i] = read_sheet(*tasks[i], frozenset())
+                else:
+                    r["markets"] = [found[h] if m is None else m for h, m in zip(r["hashes"], r["markets"])]
+            store.save_sheet(sources[i], r["file"], r["sheet"], r["rows"], r["markets"], r["hashes"])
+
+    markets, duplicates = merge_markets(r["markets"] for r in results)
+    data = build_data(())
+    data["markets"] = markets
+
+    delta = None
+    if store is not None:
+        hash_of = {id(m): h for r in results for m, h in zip(r["markets"], r["hashes"])}
+        from store import upload_key
+
+        upload = upload_key((name for name, _ in files), sheet_pattern)
+        delta = store.update_current(upload, markets, [hash_of[id(m)] for m in markets])
+
+    sheets = [{**{k: v for k, v in r.items() if k != "hashes"}, "markets": len(r["markets"])} for r in results]
+    return data, {"sheets": sheets, "duplicates": duplicates, "jobs": jobs, "delta": delta}
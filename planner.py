@@ -0,0 +1,369 @@
+# planner.py
+# Headless Wochenplanung (Python-Gegenstück zu planForWeek in template.html)
+#
+# Eingabe: build_data()-Ergebnis, ein Datum in der KW, Feiertage, "Touren zusammenhalten".
+# Ausgabe: Lieferungen je Tag, Verschiebungen, Konflikte – gleiche Regeln wie im Browser:
+# - Feiertag -> keine Lieferung an diesem Tag
+# - Montag-Feiertag -> vorwärts (Di, Mi, ...), sonst rückwärts (vorher liefern)
+# - nur innerhalb der KW; Mindestabstand je Markt (minGapDays), sonst Konflikt
+
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from feiertage import holidays_between
+
+if TYPE_CHECKING:
+    from ingest import Market
+
+DAY_KEYS = ("mo", "di", "mi", "do", "fr", "sa")
+
+DateLike = Union[date, str]
+
+
+def to_date(d: DateLike) -> date:
+    if isinstance(d, str):
+        return date.fromisoformat(d[:10])
+    return d
+
+
+def week_start(d: DateLike, week_starts_sunday: bool = True) -> date:
+    d = to_date(d)
+    if week_starts_sunday:
+        # date.weekday(): Mo=0 … So=6
+        return d - timedelta(days=(d.weekday() + 1) % 7)
+    return d - timedelta(days=d.weekday())
+
+
+def week_days(d: DateLike, week_starts_sunday: bool = True) -> List[date]:
+    start = week_start(d, week_starts_sunday)
+    return [start + timedelta(days=i) for i in range(7)]
+
+
+def pattern_for_day(market: "Market", d: date) -> str:
+    # Muster aus Excel: Mo–Sa; Sonntag = kein Plan
+    wd = d.weekday()
+    return market.pattern[wd] if wd < 6 else ""
+
+
+def plan_week(
+    data: Dict[str, Any],
+    week_date: DateLike,
+    holidays: Iterable[DateLike] = (),
+    tour_together: bool = False,
+) -> Dict[str, Any]:
+    """
+    Plant eine KW wie planForWeek() im Browser.
+
+    Rückgabe:
+      days:        ISO-Daten der KW
+      deliveries:  ISO-Datum -> [{market, tour, originalDate}]  (market = Index in data["markets"])
+      moved:       [{from, to, market, tour}]
+      conflicts:   [{type, msg, market, tour, from}]
+    """
+    meta = data.get("meta") or {}
+    markets = data.get("markets") or []
+    min_gap = int(meta.get("minGapDays") or 3)
+
+    days = week_days(week_date, bool(meta.get("weekStartsSunday")))
+    keys = [d.isoformat() for d in days]
+    hol = {to_date(h) for h in holidays}
+
+    # Lieferungen je Tag (Index 0–6) + Index Markt -> geplante Tage
+    deliveries: List[List[Dict[str, Any]]] = [[] for _ in days]
+    market_days: Dict[int, List[int]] = {}
+
+    # Rohplan aus Muster
+    for mid, m in enumerate(markets):
+        for i, d in enumerate(days):
+            tour = pattern_for_day(m, d)
+            if tour:
+                deliveries[i].append({"market": mid, "tour": tour, "originalDate": keys[i]})
+                market_days.setdefault(mid, []).append(i)
+
+    moved: List[Dict[str, Any]] = []
+    conflicts: List[Dict[str, Any]] = []
+
+    def can_place(mid: int, t: int) -> bool:
+        return all(abs(t - e) >= min_gap for e in market_days.get(mid, ()))
+
+    def find_target(base: int, direction: int, items: List[Dict[str, Any]]) -> Optional[int]:
+        t = base + direction
+        while 0 <= t < 7:
+            if days[t] not in hol and all(can_place(it["market"], t) for it in items):
+                return t
+            t += direction
+        return None
+
+    def conflict(it: Dict[str, Any], i: int, monday: bool, tour_info: str) -> None:
+        m = markets[it["market"]]
+        conflicts.append(
+            {
+                "type": "GAP_OR_RANGE",
+                "msg": (
+                    f"Kann {m.name} ({m.city}) von {keys[i]} nicht verschieben{tour_info}. "
+                    f"Regel: {'Mo → Di' if monday else 'vorher'}. Mindestabstand: {min_gap} Tage."
+                ),
+                "market": it["market"],
+                "tour": it["tour"],
+                "from": keys[i],
+            }
+        )
+
+    # Feiertage verschieben
+    for i, d in enumerate(days):
+        if d not in hol or not deliveries[i]:
+            continue
+
+        # Feiertag: keine Lieferung am Tag selbst
+        items = deliveries[i]
+        deliveries[i] = []
+        for it in items:
+            market_days[it["market"]].remove(i)
+
+        monday = d.weekday() == 0
+        direction = 1 if monday else -1
+
+        if tour_together:
+            # Touren gruppieren (Reihenfolge wie im Rohplan)
+            groups: Dict[str, List[Dict[str, Any]]] = {}
+            for it in items:
+                groups.setdefault(it["tour"], []).append(it)
+            batches = [(g, f" (Tour {tour})") for tour, g in groups.items()]
+        else:
+            batches = [([it], "") for it in items]
+
+        for batch, tour_info in batches:
+            t = find_target(i, direction, batch)
+
+            if t is None:
+                for it in batch:
+                    conflict(it, i, monday, tour_info)
+                continue
+
+            for it in batch:
+                deliveries[t].append(it)
+                market_days[it["market"]].append(t)
+                moved.append({"from": keys[i], "to": keys[t], "market": it["market"], "tour": it["tour"]})
+
+    return {
+        "days": keys,
+        "deliveries": dict(zip(keys, deliveries)),
+        "moved": moved,
+        "conflicts": conflicts,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Zeitraum-Planung (viele KWs in einem Durchlauf)
+#
+# Die Slot-Zuordnung (Slot 0–6 -> Wochentag) ist für alle KWs gleich, das Muster je Markt
+# also auch. Eine KW unterscheidet sich nur durch ihre Feiertags-Bitmaske – KWs mit gleicher
+# Maske liefern dasselbe Ergebnis und werden nur einmal gerechnet (ein Jahr hat ~10 Masken).
+# ---------------------------------------------------------------------------
+
+
+def week_index(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Rohplan je Slot als Bitmasken (Gegenstück zu rawPlanInit im Browser)."""
+    meta = data.get("meta") or {}
+    markets = data.get("markets") or []
+    sunday = bool(meta.get("weekStartsSunday"))
+    min_gap = int(meta.get("minGapDays") or 3)
+
+    # Slot -> date.weekday() (Mo=0 … So=6)
+    weekdays = [(i - 1) % 7 if sunday else i for i in range(7)]
+
+    masks: List[int] = []
+    day_markets: List[List[int]] = [[] for _ in range(7)]
+    # Slot -> Tour -> Märkte (Reihenfolge: erster Markt der Tour, wie im Rohplan)
+    groups: List[Dict[str, List[int]]] = [{} for _ in range(7)]
+
+    for mid, m in enumerate(markets):
+        pattern = m.pattern
+        mask = 0
+        for i, wd in enumerate(weekdays):
+            tour = pattern[wd] if wd < 6 else ""
+            if tour:
+                mask |= 1 << i
+                day_markets[i].append(mid)
+                groups[i].setdefault(tour, []).append(mid)
+        masks.append(mask)
+
+    # Slots mit Abstand < minGap zu t (inkl. t selbst)
+    near = [sum(1 << j for j in range(7) if abs(j - t) < min_gap) for t in range(7)]
+
+    return {
+        "weekdays": weekdays,
+        "masks": masks,
+        "day_markets": day_markets,
+        "groups": groups,
+        "near": near,
+        "raw_stops": sum(len(x) for x in day_markets),
+    }
+
+
+def plan_moves(idx: Dict[str, Any], hol_mask: int, tour_together: bool = False) -> Dict[int, Optional[int]]:
+    """
+    Verschiebungen einer KW mit Feiertags-Bitmaske (Slot-Bits): Markt << 3 | Slot -> Ziel-Slot,
+    None = Konflikt. Enthält nur Lieferungen an Feiertagen, alle übrigen bleiben auf ihrem Slot.
+    """
+    masks = idx["masks"]
+    near = idx["near"]
+    mask: Dict[int, int] = {}
+    moves: Dict[int, Optional[int]] = {}
+
+    for i in range(7):
+        if not hol_mask >> i & 1 or not idx["day_markets"][i]:
+            continue
+
+        items = idx["day_markets"][i]
+        bit = 1 << i
+        for mid in items:
+            mask[mid] = mask.get(mid, masks[mid]) & ~bit
+
+        direction = 1 if idx["weekdays"][i] == 0 else -1
+        batches = idx["groups"][i].values() if tour_together else [[mid] for mid in items]
+
+        for batch in batches:
+            t = i + direction
+            while 0 <= t < 7:
+                if not hol_mask >> t & 1 and all(not mask[mid] & near[t] for mid in batch):
+                    break
+                t += direction
+            else:
+                for mid in batch:
+                    moves[mid << 3 | i] = None
+                continue
+
+            for mid in batch:
+                mask[mid] |= 1 << t
+                moves[mid << 3 | i] = t
+
+    return moves
+
+
+def plan_counts(idx: Dict[str, Any], hol_mask: int, tour_together: bool = False) -> Dict[str, int]:
+    """Zählt Stopps/Verschiebungen/Konflikte einer KW mit Feiertags-Bitmaske (Slot-Bits)."""
+    moves = plan_moves(idx, hol_mask, tour_together)
+    conflicts = sum(t is None for t in moves.values())
+    return {"stops": idx["raw_stops"] - conflicts, "moved": len(moves) - conflicts, "conflicts": conflicts}
+
+
+def range_holidays(
+    start: date, end: date, bundesland: Optional[str] = None, holidays: Iterable[DateLike] = ()
+) -> Dict[date, str]:
+    """Gesetzliche Feiertage (feiertage.py) plus zusätzliche Tage, jeweils nur innerhalb start..end."""
+    hol = holidays_between(start, end, bundesland)
+    for h in holidays:
+        h = to_date(h)
+        if start <= h <= end:
+            hol.setdefault(h, "Zusätzlicher Feiertag")
+    return hol
+
+
+def plan_range(
+    data: Dict[str, Any],
+    start: DateLike,
+    end: DateLike,
+    bundesland: Optional[str] = None,
+    holidays: Iterable[DateLike] = (),
+    tour_together: bool = False,
+) -> Dict[str, Any]:
+    """
+    Plant alle KWs, die den Zeitraum start..end berühren, in einem Durchlauf.
+
+    Feiertage: gesetzliche Feiertage des Bundeslands (feiertage.py, ohne Bundesland nur
+    bundesweite) plus zusätzliche Tage aus `holidays` – jeweils nur innerhalb start..end.
+    Jede KW wird wie plan_week() geplant (Verschiebungen bleiben in der KW).
+
+    Rückgabe:
+      holidays:  ISO-Datum -> Name
+      weeks:     [{week_start, holidays, stops, moved, conflicts}]
+      totals:    {weeks, stops, moved, conflicts}
+    """
+    start, end = to_date(start), to_date(end)
+    if end < start:
+        raise ValueError(f"Zeitraum ungültig: {start} > {end}")
+
+    hol = range_holidays(start, end, bundesland, holidays)
+    idx = week_index(data)
+    sunday = bool((data.get("meta") or {}).get("weekStartsSunday"))
+
+    memo: Dict[int, Dict[str, int]] = {}
+    weeks: List[Dict[str, Any]] = []
+    totals = {"weeks": 0, "stops": 0, "moved": 0, "conflicts": 0}
+
+    ws = week_start(start, sunday)
+    while ws <= end:
+        hol_days = [ws + timedelta(days=i) for i in range(7) if ws + timedelta(days=i) in hol]
+        hol_mask = sum(1 << (d - ws).days for d in hol_days)
+
+        counts = memo.get(hol_mask)
+        if counts is None:
+            counts = memo[hol_mask] = plan_counts(idx, hol_mask, tour_together)
+
+        weeks.append({"week_start": ws.isoformat(), "holidays": [d.isoformat() for d in hol_days], **counts})
+        totals["weeks"] += 1
+        for k in ("stops", "moved", "conflicts"):
+            totals[k] += counts[k]
+        ws += timedelta(days=7)
+
+    return {
+        "holidays": {d.isoformat(): n for d, n in sorted(hol.items())},
+        "weeks": weeks,
+        "totals": totals,
+    }
+
+
+# Slot-Bitmaske (7 Bit) -> gesetzte Slots
+_SLOTS = [tuple(i for i in range(7) if b >> i & 1) for b in range(128)]
+
+
+def iter_plan_rows(
+    data: Dict[str, Any],
+    start: DateLike,
+    end: Optional[DateLike] = None,
+    bundesland: Optional[str] = None,
+    holidays: Iterable[DateLike] = (),
+    tour_together: bool = False,
+) -> Iterator[Tuple[date, int, str, date, Optional[date]]]:
+    """
+    Einzelne Lieferungen des Plans für start..end (ohne end: die KW von start), KW für KW wie
+    plan_range(): (KW-Beginn, Markt-Index, Tour, Originaldatum, Zieldatum – None bei Konflikt).
+    Reihenfolge: KW, Markt, Originaltag; nur Originaldaten innerhalb start..end.
+
+    Zeilen werden nicht gesammelt: gehalten werden nur der Wochen-Index und die Verschiebungen
+    je Feiertags-Maske, unabhängig von der Länge des Zeitraums.
+    """
+    markets = data.get("markets") or []
+    sunday = bool((data.get("meta") or {}).get("weekStartsSunday"))
+    start = to_date(start)
+    if end is None:
+        start = week_start(start, sunday)
+        end = start + timedelta(days=6)
+    end = to_date(end)
+    if end < start:
+        raise ValueError(f"Zeitraum ungültig: {start} > {end}")
+
+    hol = range_holidays(start, end, bundesland, holidays)
+    idx = week_index(data)
+    masks = idx["masks"]
+    weekdays = idx["weekdays"]
+    memo: Dict[int, Dict[int, Optional[int]]] = {0: {}}
+
+    ws = week_start(start, sunday)
+    while ws <= end:
+        days = [ws + timedelta(days=i) for i in range(7)]
+        hol_mask = sum(1 << i for i, d in enumerate(days) if d in hol)
+        moves = memo.get(hol_mask)
+        if moves is None:
+            moves = memo[hol_mask] = plan_moves(idx, hol_mask, tour_together)
+        inside = [start <= d <= end for d in days]
+
+        for mid, m in enumerate(markets):
+            for i in _SLOTS[masks[mid]]:
+                if not inside[i]:
+                    continue
+                t = moves[mid << 3 | i] if hol_mask >> i & 1 else i
+                yield ws, mid, m.pattern[weekdays[i]], days[i], None if t is None else days[t]
+
+        ws += timedelta(days=7)
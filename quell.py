@@ -8,13 +8,35 @@
 #   Betroffene Kunden/Lieferungen werden PRINCIPIell vorher beliefert (rückwärts verschoben).
 # - Ausnahme: Ist der Feiertag Montag -> wird auf Dienstag geschoben (vorwärts).
 # - Zusätzlich: Mindestabstand je Markt (minGapDays) wird eingehalten, sonst Konflikt.
+#
+# Messwerte je Upload und Stufe: JSON-Zeilen über den Logger "quell" auf stderr (eigener Handler,
+# Standard INFO; QUELL_LOG_LEVEL=WARNING schaltet sie ab), zusätzlich mit QUELL_METRICS_FILE=<Pfad>
+# in eine Datei, mit QUELL_TRACE_MEMORY=1 inkl. Spitzen-Speicher (tracemalloc).
 
+import hashlib
+import io
 import json
-from typing import Any, Dict, List
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
-import pandas as pd
 import streamlit as st
 
+# ingest lädt pandas/openpyxl erst beim Lesen, render die template.html erst beim Schreiben:
+# Kaltstart und Reruns ohne Upload bleiben schlank.
+from ingest import SHEET_NAME
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+    from store import MarketStore
+
 
 # ----------------------------
 # Streamlit setup
@@ -22,686 +44,426 @@ import streamlit as st
 st.set_page_config(page_title="Excel → Interaktive HTML", layout="centered")
 st.title("Excel hochladen → Interaktive HTML erzeugen (Standalone)")
 
-uploaded = st.file_uploader("Excel-Datei auswählen", type=["xlsx", "xlsm", "xls"])
+uploaded = st.file_uploader("Excel-Dateien auswählen", type=["xlsx", "xlsm", "xls"], accept_multiple_files=True)
+sheet_pattern = st.text_input(
+    "Blatt / Muster",
+    value=SHEET_NAME,
+    help="Exakter Blattname oder Muster mit * und ?, z. B. „Direkt*“. Passende Blätter aller Dateien "
+    "werden parallel gelesen und zusammengeführt (doppelte CSB/SAP nur einmal).",
+).strip() or SHEET_NAME
+
+# Obergrenze für den Upload-Cache (HTML-Bytes aller Varianten + geschätzter Speicher der Märkte)
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Schätzwert Speicher je Markt in data (Market-Tupel mit Strings; ~59 MB je 100k laut Benchmark)
+CACHE_BYTES_PER_MARKET = 600
+
+# Messwerte je Stufe: zusätzlich als JSON-Zeilen in diese Datei (leer = nur Log)
+METRICS_FILE = os.environ.get("QUELL_METRICS_FILE", "")
+# Spitzen-Speicher je Stufe über tracemalloc (kostet Laufzeit, daher nur auf Wunsch)
+TRACE_MEMORY = os.environ.get("QUELL_TRACE_MEMORY", "") not in ("", "0")
+# Prozesse zum Einlesen, von allen Sessions geteilt (ein Pool je App-Prozess)
+INGEST_JOBS = max(1, int(os.environ.get("QUELL_INGEST_JOBS", "0")) or min(4, os.cpu_count() or 1))
+# Markt-Speicher (SQLite) für Delta-Einlesen über Neustarts hinweg (leer = aus)
+STORE_PATH = os.environ.get("QUELL_STORE", os.path.join(os.path.expanduser("~"), ".cache", "quell", "markets.sqlite"))
+
+# Messwert-Zeilen: eigener Handler, da Streamlit nur seine eigenen Logger konfiguriert (sonst WARNING, keine Ausgabe)
+LOG_LEVEL = os.environ.get("QUELL_LOG_LEVEL", "INFO").upper()
+
+log = logging.getLogger("quell")
+if not log.handlers:  # Skript läuft bei jedem Rerun erneut
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s quell %(message)s"))
+    log.addHandler(_handler)
+    log.setLevel(LOG_LEVEL)
+    log.propagate = False
 
 
 # ----------------------------
-# Helpers
+# Upload-Cache
 # ----------------------------
-def norm_str(x: Any) -> str:
-    if pd.isna(x):
-        return ""
-    return str(x).strip()
-
+def cache_key(raws: Sequence[bytes], sheet_pattern: str) -> str:
+    # Reihenfolge zählt (erste Datei gewinnt bei Duplikaten)
+    h = hashlib.sha256()
+    for raw in raws:
+        h.update(hashlib.sha256(raw).digest())
+    h.update(b"\0" + sheet_pattern.encode("utf-8"))
+    return h.hexdigest()
 
-def norm_tour(x: Any) -> str:
-    if pd.isna(x):
-        return ""
-    s = str(x).strip()
-    # häufig: 1201.0 -> 1201
-    if s.endswith(".0"):
-        s = s[:-2]
-    return s
 
-
-def build_data(df: pd.DataFrame) -> Dict[str, Any]:
+class ParseCache:
     """
-    Liest ALLE Zeilen aus dem Excel-Blatt ein.
-    Leere Zeilen werden übersprungen.
+    LRU-Cache: SHA-256(Uploads + Blattmuster) -> (data, HTML-Bytes je Variante, Infos).
+    Begrenzt über die Summe aus HTML-Bytes und geschätztem Speicher der Märkte
+    (CACHE_BYTES_PER_MARKET); älteste Einträge fliegen zuerst raus.
     """
-    markets: List[Dict[str, Any]] = []
-
-    if df.shape[1] < 12:
-        raise ValueError("Excel-Blatt hat weniger als 12 Spalten (A–L).")
-
-    for _, r in df.iterrows():
-        csb = norm_str(r.iloc[0])
-        sap = norm_str(r.iloc[1])
-        name = norm_str(r.iloc[2])
-        street = norm_str(r.iloc[3])
-        zipc = norm_str(r.iloc[4])
-        city = norm_str(r.iloc[5])
-
-        if not (csb or sap or name):
-            continue
-
-        pattern = {
-            "mo": norm_tour(r.iloc[6]),
-            "di": norm_tour(r.iloc[7]),
-            "mi": norm_tour(r.iloc[8]),
-            "do": norm_tour(r.iloc[9]),
-            "fr": norm_tour(r.iloc[10]),
-            "sa": norm_tour(r.iloc[11]),
-        }
 
-        markets.append(
-            {
-                "csb": csb,
-                "sap": sap,
-                "name": name,
-                "street": street,
-                "zip": zipc,
-                "city": city,
-                "pattern": pattern,
-            }
-        )
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], Dict[str, bytes], Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], Dict[str, bytes], Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, data: Dict[str, Any], outputs: Dict[str, bytes], info: Dict[str, Any]) -> None:
+        size = self._entry_size(data, outputs)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= self._entry_size(old[0], old[1])
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (data, outputs, info)
+            self.size += size
+            self._evict()
+
+    def add_output(self, key: str, variant: str, blob: bytes) -> None:
+        """Nachträglich erzeugte Variante (z. B. ZIP je Tour) zum Eintrag legen, falls noch im Cache."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or variant in entry[1]:
+                return
+            entry[1][variant] = blob
+            self.size += len(blob)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes:
+            _, (data, outputs, _) = self._entries.popitem(last=False)
+            self.size -= self._entry_size(data, outputs)
+
+    @staticmethod
+    def _entry_size(data: Dict[str, Any], outputs: Dict[str, bytes]) -> int:
+        return len(data["markets"]) * CACHE_BYTES_PER_MARKET + sum(len(b) for b in outputs.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@st.cache_resource
+def get_parse_cache() -> ParseCache:
+    # einmal pro Prozess, von allen Sessions geteilt
+    return ParseCache(CACHE_MAX_BYTES)
+
+
+@st.cache_resource
+def get_ingest_pool() -> "ProcessPoolExecutor":
+    # einmal pro Prozess, Worker starten einmal beim ersten Upload statt je Upload. Kein "spawn":
+    # Streamlit setzt __main__ auf quell.py, neue Interpreter würden die App-Seite ausführen.
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=INGEST_JOBS)
+
+
+@st.cache_resource
+def get_market_store() -> Optional["MarketStore"]:
+    # einmal pro Prozess; ohne beschreibbaren Pfad läuft das Einlesen ohne Speicher
+    if not STORE_PATH:
+        return None
+    from store import MarketStore
 
-    return {
-        "meta": {
-            # feste Logik: Woche beginnt Sonntag (So–Sa)
-            "weekStartsSunday": True,
-            "minGapDays": 3,
-        },
-        "markets": markets,
-    }
-
-
-HTML_TEMPLATE = r"""<!doctype html>
-<html lang="de">
-<head>
-<meta charset="utf-8"/>
-<meta name="viewport" content="width=device-width,initial-scale=1"/>
-<title>Belieferungsschema – Interaktiv</title>
-<style>
-  body { font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial; margin: 16px; background:#f4f5f7; }
-  .wrap { max-width: 1400px; margin: 0 auto; }
-  .card { background:#fff; border:1px solid #ddd; border-radius:14px; padding:14px; box-shadow: 0 2px 10px rgba(0,0,0,.04); }
-  .row { display:flex; gap:12px; flex-wrap:wrap; align-items:center; }
-  .grow { flex:1; }
-  input, select, button { padding:10px 12px; border-radius:10px; border:1px solid #ccc; background:#fff; }
-  button { cursor:pointer; }
-  .muted { color:#666; font-size: 13px; }
-  .h2 { font-size:18px; margin: 8px 0; }
-  .pill { display:inline-block; padding:4px 10px; border-radius:999px; border:1px solid #ddd; background:#fafafa; font-size:12px; }
-  .tag { display:inline-flex; align-items:center; gap:6px; padding:6px 10px; border-radius:999px; border:1px solid #ddd; background:#fff; font-size:12px; }
-  .tag input { margin:0; }
-  .hr { height:1px; background:#eee; margin:10px 0; }
-  .bad { color:#b00; }
-  .ok { color:#0a6; }
-  .small { font-size:12px; }
-
-  /* Feiertage Buttons */
-  .grid7 { display:grid; grid-template-columns: repeat(7, 1fr); gap:10px; }
-  .daybtn { padding:10px; border-radius:12px; border:1px solid #ccc; background:#fff; text-align:center; user-select:none; cursor:pointer; }
-  .holiday { border-color:#d33; background: #ffecec; }
-
-  /* Matrix */
-  .matrixWrap { overflow:auto; max-height: 72vh; border:1px solid #e3e3e3; border-radius:12px; background:#fff; }
-  table.matrix { border-collapse: separate; border-spacing:0; width: 100%; font-size: 13px; }
-  table.matrix th, table.matrix td { padding:8px 10px; border-bottom:1px solid #eee; border-right:1px solid #f0f0f0; white-space:nowrap; vertical-align:top; }
-  table.matrix th { position: sticky; top: 0; background: #fafafa; z-index: 3; }
-  table.matrix td.market { position: sticky; left: 0; background:#fff; z-index: 2; border-right:1px solid #e6e6e6; min-width: 280px; }
-  table.matrix th.marketH { position: sticky; left:0; z-index: 4; background:#fafafa; border-right:1px solid #e6e6e6; min-width: 280px; }
-  .tourCell { display:flex; gap:6px; align-items:center; justify-content:space-between; }
-  .tourNum { font-weight:800; }
-  .empty { color:#bbb; }
-  .holidayCell { background:#ffecec; }
-  .movedIn { background:#eafff0; }
-  .badge { font-size:11px; padding:2px 8px; border-radius:999px; border:1px solid #ddd; background:#fff; }
-
-  /* rechte Seite */
-  .split { display:grid; grid-template-columns: 1.25fr .75fr; gap:12px; }
-  @media (max-width: 900px) { .split { grid-template-columns: 1fr; } }
-
-  .box { border:1px solid #e3e3e3; border-radius:12px; padding:10px; background:#fff; }
-</style>
-</head>
-<body>
-<div class="wrap">
-
-  <div class="card">
-    <div class="row">
-      <div class="grow">
-        <div class="h2">Belieferungsschema – Übersicht (Alles auf einen Blick)</div>
-        <div class="muted">Datum wählen → KW wird angezeigt → Feiertage anklicken → Matrix aktualisiert sich sofort.</div>
-      </div>
-
-      <div>
-        <label class="muted">Datum in KW</label><br/>
-        <input id="datePick" type="date"/>
-      </div>
-
-      <div>
-        <label class="muted">Suche</label><br/>
-        <input id="q" placeholder="Markt / Ort / CSB / SAP / Tour…"/>
-      </div>
-
-      <div>
-        <label class="muted">Ansicht</label><br/>
-        <select id="view">
-          <option value="matrix" selected>Matrix (Übersicht)</option>
-          <option value="conflicts">Konflikte</option>
-        </select>
-      </div>
-
-      <div>
-        <label class="muted">Feiertage</label><br/>
-        <button id="clearH">Feiertage löschen</button>
-      </div>
-    </div>
-
-    <div style="margin-top:12px" class="row">
-      <span id="kwLabel" class="pill"></span>
-      <span class="pill">Mindestabstand: <b id="gapLabel"></b> Tage</span>
-      <span class="pill">Woche: <b id="rangeLabel"></b></span>
-
-      <span class="tag">
-        <input type="checkbox" id="modeTourTogether"/>
-        <label for="modeTourTogether">Touren zusammenhalten</label>
-      </span>
-    </div>
-
-    <div class="muted small" style="margin-top:8px">
-      Regeln: Feiertag = keine Lieferung. Normal: vorher liefern (rückwärts). Ausnahme: Feiertag Montag → auf Dienstag schieben.
-      Farben: <span class="pill">Feiertag = rot</span> <span class="pill">verschoben = grün</span>
-    </div>
-  </div>
-
-  <div style="height:12px"></div>
-
-  <div class="card">
-    <div class="h2">Feiertage in dieser Woche</div>
-    <div id="weekDays" class="grid7"></div>
-    <div class="muted" style="margin-top:8px">
-      Klick auf Tag = Feiertag an/aus (nur für die aktuell gewählte KW).
-    </div>
-  </div>
-
-  <div style="height:12px"></div>
-
-  <div class="split">
-    <div class="card">
-      <div class="h2" id="leftTitle">Matrix</div>
-      <div id="left"></div>
-    </div>
-
-    <div class="card">
-      <div class="h2">Zusammenfassung</div>
-      <div id="summary" class="muted"></div>
-      <div class="hr"></div>
-      <div class="box">
-        <div class="muted small">
-          <b>Hinweis:</b><br/>
-          Diese Version verschiebt innerhalb der KW. (Vorwoche ist NICHT erlaubt.)<br/>
-          Wenn Mindestabstand je Markt nicht einhaltbar ist → Konflikt.
-        </div>
-      </div>
-    </div>
-  </div>
-
-</div>
-
-<script>
-// --------- embedded data ----------
-const DATA = __DATA__;
-
-// --------- config ----------
-const weekStartsSunday = !!(DATA.meta && DATA.meta.weekStartsSunday);
-const minGapDays = Number((DATA.meta && DATA.meta.minGapDays) || 3);
-
-// --------- state ----------
-const state = {
-  date: null,
-  holidays: new Set(),   // ISO date strings der aktuellen Woche
-  view: "matrix",
-  q: "",
-  tourTogether: false,
-};
-
-const el = (id) => document.getElementById(id);
-
-function pad(n){ return String(n).padStart(2,'0'); }
-function iso(d){ return d.getFullYear()+"-"+pad(d.getMonth()+1)+"-"+pad(d.getDate()); }
-function parseISO(s){
-  const [y,m,da] = s.split("-").map(Number);
-  return new Date(y, m-1, da);
-}
-function addDays(d, n){
-  const x = new Date(d);
-  x.setDate(x.getDate() + n);
-  return new Date(x.getFullYear(), x.getMonth(), x.getDate());
-}
-function weekdayName(d){
-  return ["So","Mo","Di","Mi","Do","Fr","Sa"][d.getDay()];
-}
-function weekRange(d){
-  const dow = d.getDay();
-  let start;
-  if (weekStartsSunday){
-    start = addDays(d, -dow);
-  } else {
-    const diff = (dow === 0) ? 6 : (dow - 1);
-    start = addDays(d, -diff);
-  }
-  const end = addDays(start, 6);
-  return {start, end};
-}
-function isoWeekNumber(date){
-  const d = new Date(Date.UTC(date.getFullYear(), date.getMonth(), date.getDate()));
-  const dayNum = d.getUTCDay() || 7;
-  d.setUTCDate(d.getUTCDate() + 4 - dayNum);
-  const yearStart = new Date(Date.UTC(d.getUTCFullYear(),0,1));
-  const weekNo = Math.ceil((((d - yearStart) / 86400000) + 1) / 7);
-  return {year: d.getUTCFullYear(), week: weekNo};
-}
-function daterange(start, end){
-  const out = [];
-  let cur = new Date(start);
-  while (cur <= end){
-    out.push(cur);
-    cur = addDays(cur, 1);
-  }
-  return out;
-}
-function getPatternForDow(market, dowJS){
-  // Muster aus Excel: Mo–Sa; Sonntag = kein Plan
-  const map = {1:"mo",2:"di",3:"mi",4:"do",5:"fr",6:"sa"};
-  const k = map[dowJS];
-  return k ? (market.pattern[k] || "") : "";
-}
-function diffDays(aISO, bISO){
-  const a = parseISO(aISO);
-  const b = parseISO(bISO);
-  return Math.round((a - b) / 86400000);
-}
-
-function buildWeekDaysUI(){
-  const wr = weekRange(state.date);
-  const days = daterange(wr.start, wr.end);
-  const cont = el("weekDays");
-  cont.innerHTML = "";
-
-  for (let i=0;i<days.length;i++){
-    const day = days[i];
-    const key = iso(day);
-    const btn = document.createElement("div");
-    btn.className = "daybtn" + (state.holidays.has(key) ? " holiday" : "");
-    btn.innerHTML = `
-      <div><b>${weekdayName(day)}</b></div>
-      <div class="small">${pad(day.getDate())}.${pad(day.getMonth()+1)}</div>
-    `;
-    btn.onclick = () => {
-      if (state.holidays.has(key)) state.holidays.delete(key);
-      else state.holidays.add(key);
-      render();
-    };
-    cont.appendChild(btn);
-  }
-}
-
-function marketIdInit(){
-  (DATA.markets || []).forEach((m, idx) => { m._id = idx; });
-}
-
-function planForWeek(){
-  const wr = weekRange(state.date);
-  const days = daterange(wr.start, wr.end);
-
-  // deliveries: Map(dateISO -> Array of items)
-  // item: { market, tour, originalDate }
-  const deliveries = new Map();
-  days.forEach(d => deliveries.set(iso(d), []));
-
-  // Rohplan aus Muster
-  for (const m of (DATA.markets || [])){
-    for (const d of days){
-      const tour = getPatternForDow(m, d.getDay());
-      if (tour){
-        deliveries.get(iso(d)).push({market:m, tour:tour, originalDate: iso(d)});
-      }
-    }
-  }
-
-  const moved = [];      // {from,to, market, tour}
-  const conflicts = [];  // {type, msg, market, tour, from}
-
-  function getExistingDatesForMarket(mid){
-    const out = [];
-    for (const [dk, arr] of deliveries.entries()){
-      for (const it of arr){
-        if (it.market._id === mid) out.push(dk);
-      }
-    }
-    out.sort();
-    return out;
-  }
-
-  function canPlace(market, targetISO){
-    const existing = getExistingDatesForMarket(market._id);
-    for (const ed of existing){
-      const gap = Math.abs(diffDays(targetISO, ed));
-      if (gap < minGapDays) return false;
-    }
-    return true;
-  }
-
-  // Zieltag finden nach deiner Regel:
-  // - Montag-Feiertag: vorwärts (Di, Mi, ...)
-  // - sonst: rückwärts (vorher liefern)
-  function findTargetDateISO(baseDate, direction, marketOrItems){
-    let target = addDays(baseDate, direction);
-
-    while (target >= wr.start && target <= wr.end){
-      const tISO = iso(target);
-
-      // nicht auf Feiertag
-      if (state.holidays.has(tISO)) { target = addDays(target, direction); continue; }
-
-      // Gap-Check
-      if (Array.isArray(marketOrItems)){
-        let ok = true;
-        for (const it of marketOrItems){
-          if (!canPlace(it.market, tISO)) { ok = false; break; }
-        }
-        if (ok) return tISO;
-      } else {
-        if (canPlace(marketOrItems.market, tISO)) return tISO;
-      }
-
-      target = addDays(target, direction);
-    }
-
-    return null;
-  }
-
-  // Feiertage verschieben
-  for (const d of days){
-    const dayISO = iso(d);
-    if (!state.holidays.has(dayISO)) continue;
-
-    const items = deliveries.get(dayISO) || [];
-    if (!items.length) continue;
-
-    // Feiertag: keine Lieferung am Tag selbst
-    deliveries.set(dayISO, []);
-
-    const isMondayHoliday = (d.getDay() === 1);  // Mo
-    const dir = isMondayHoliday ? +1 : -1;       // Mo -> vorwärts, sonst rückwärts
-
-    if (state.tourTogether){
-      // Touren gruppieren
-      const groups = new Map();
-      for (const it of items){
-        if (!groups.has(it.tour)) groups.set(it.tour, []);
-        groups.get(it.tour).push(it);
-      }
-
-      for (const [tour, gitems] of groups.entries()){
-        const targetISO = findTargetDateISO(d, dir, gitems);
-
-        if (!targetISO){
-          for (const it of gitems){
-            conflicts.push({
-              type: "GAP_OR_RANGE",
-              msg: `Kann ${it.market.name} (${it.market.city}) von ${dayISO} nicht verschieben (Tour ${tour}). Regel: ${isMondayHoliday ? "Mo → Di" : "vorher"}. Mindestabstand: ${minGapDays} Tage.`,
-              market: it.market, tour: it.tour, from: dayISO
-            });
-          }
-          continue;
-        }
+    try:
+        return MarketStore(STORE_PATH)
+    except Exception as e:
+        log.warning("Markt-Speicher %s nicht verfügbar: %s", STORE_PATH, e)
+        return None
 
-        for (const it of gitems){
-          deliveries.get(targetISO).push(it);
-          moved.push({from: dayISO, to: targetISO, market: it.market, tour: it.tour});
-        }
-      }
-    } else {
-      // itemweise
-      for (const it of items){
-        const targetISO = findTargetDateISO(d, dir, it);
-
-        if (!targetISO){
-          conflicts.push({
-            type: "GAP_OR_RANGE",
-            msg: `Kann ${it.market.name} (${it.market.city}) von ${dayISO} nicht verschieben. Regel: ${isMondayHoliday ? "Mo → Di" : "vorher"}. Mindestabstand: ${minGapDays} Tage.`,
-            market: it.market, tour: it.tour, from: dayISO
-          });
-          continue;
-        }
 
-        deliveries.get(targetISO).push(it);
-        moved.push({from: dayISO, to: targetISO, market: it.market, tour: it.tour});
-      }
-    }
-  }
-
-  return {wr, days, deliveries, moved, conflicts};
-}
-
-function renderSummary(plan){
-  let totalStops = 0;
-  for (const [, arr] of plan.deliveries.entries()) totalStops += arr.length;
-
-  el("summary").innerHTML = `
-    <div>Märkte gesamt: <b>${(DATA.markets||[]).length}</b></div>
-    <div>Stops diese KW: <b>${totalStops}</b></div>
-    <div>Feiertage markiert: <b>${state.holidays.size}</b></div>
-    <div>Verschoben: <b>${plan.moved.length}</b></div>
-    <div>Konflikte: <b class="${plan.conflicts.length ? "bad":"ok"}">${plan.conflicts.length}</b></div>
-  `;
-}
-
-function renderConflicts(plan, q){
-  const root = el("left");
-  root.innerHTML = "";
-
-  if (!plan.conflicts.length){
-    root.innerHTML = `<div class="muted">Keine Konflikte 🎉</div>`;
-    return;
-  }
-
-  for (const c of plan.conflicts){
-    const hay = (c.market.name+" "+c.market.city+" "+c.market.csb+" "+c.market.sap+" "+c.tour).toLowerCase();
-    if (q && !hay.includes(q)) continue;
-
-    const div = document.createElement("div");
-    div.className = "box";
-    div.innerHTML = `
-      <div><b class="bad">Konflikt</b> – Tour <b>${c.tour}</b></div>
-      <div class="muted small">${c.from}</div>
-      <div class="muted">${c.msg}</div>
-    `;
-    root.appendChild(div);
-  }
-}
-
-function renderMatrix(plan, q){
-  const root = el("left");
-  root.innerHTML = "";
-
-  // movedIn[dateISO][marketId] = fromDateISO
-  const movedIn = new Map();
-  for (const mv of plan.moved){
-    if (!movedIn.has(mv.to)) movedIn.set(mv.to, new Map());
-    movedIn.get(mv.to).set(mv.market._id, mv.from);
-  }
-
-  const wrap = document.createElement("div");
-  wrap.className = "matrixWrap";
-
-  const t = document.createElement("table");
-  t.className = "matrix";
-
-  const days = plan.days;
-
-  // Header
-  const thead = document.createElement("thead");
-  const hr = document.createElement("tr");
-
-  const th0 = document.createElement("th");
-  th0.className = "marketH";
-  th0.textContent = "Markt";
-  hr.appendChild(th0);
-
-  for (const d of days){
-    const dk = iso(d);
-    const th = document.createElement("th");
-    th.textContent = `${weekdayName(d)} ${d.toLocaleDateString('de-DE')}${state.holidays.has(dk) ? " (FT)" : ""}`;
-    hr.appendChild(th);
-  }
-
-  thead.appendChild(hr);
-  t.appendChild(thead);
-
-  // Precompute day->market->tour
-  const dayMarketTour = new Map();
-  for (const d of days){
-    const dk = iso(d);
-    const map = new Map();
-    const arr = plan.deliveries.get(dk) || [];
-    for (const it of arr){
-      map.set(it.market._id, it.tour);
-    }
-    dayMarketTour.set(dk, map);
-  }
-
-  // Markets filter
-  const markets = (DATA.markets || []).filter(m => {
-    if (!q) return true;
-    const hay = (m.name+" "+m.city+" "+m.csb+" "+m.sap).toLowerCase();
-    return hay.includes(q);
-  });
-
-  const tbody = document.createElement("tbody");
-
-  for (const m of markets){
-    const tr = document.createElement("tr");
-
-    const tdM = document.createElement("td");
-    tdM.className = "market";
-    tdM.innerHTML = `<div><b>${m.name}</b></div><div class="muted small">${m.city} · CSB ${m.csb} · SAP ${m.sap}</div>`;
-    tr.appendChild(tdM);
-
-    for (const d of days){
-      const dk = iso(d);
-      const td = document.createElement("td");
-
-      if (state.holidays.has(dk)) td.classList.add("holidayCell");
-
-      const tour = (dayMarketTour.get(dk) || new Map()).get(m._id) || "";
-      const movedFrom = movedIn.get(dk)?.get(m._id);
-
-      if (movedFrom) td.classList.add("movedIn");
-
-      if (!tour){
-        td.innerHTML = `<span class="empty">–</span>`;
-      } else {
-        td.innerHTML = `
-          <div class="tourCell">
-            <span class="tourNum">${tour}</span>
-            ${movedFrom ? `<span class="badge">${movedFrom.slice(0,10)} →</span>` : ``}
-          </div>
-        `;
-      }
-
-      tr.appendChild(td);
-    }
-
-    tbody.appendChild(tr);
-  }
-
-  t.appendChild(tbody);
-  wrap.appendChild(t);
-  root.appendChild(wrap);
-}
-
-function render(){
-  const wn = isoWeekNumber(state.date);
-  const wr = weekRange(state.date);
-
-  el("kwLabel").textContent = `KW ${wn.week} / ${wn.year}`;
-  el("gapLabel").textContent = String(minGapDays);
-  el("rangeLabel").textContent = `${wr.start.toLocaleDateString('de-DE')} – ${wr.end.toLocaleDateString('de-DE')}`;
-
-  buildWeekDaysUI();
-
-  const plan = planForWeek();
-  renderSummary(plan);
-
-  const q = state.q.trim().toLowerCase();
-
-  el("leftTitle").textContent = (state.view === "conflicts") ? "Konflikte" : "Matrix (Übersicht)";
-
-  if (state.view === "conflicts"){
-    renderConflicts(plan, q);
-  } else {
-    renderMatrix(plan, q);
-  }
-}
-
-function init(){
-  marketIdInit();
-
-  const today = new Date();
-  state.date = new Date(today.getFullYear(), today.getMonth(), today.getDate());
-  el("datePick").value = iso(state.date);
-
-  el("datePick").addEventListener("change", (e) => {
-    state.date = parseISO(e.target.value);
-    state.holidays.clear();
-    render();
-  });
-
-  el("view").addEventListener("change", (e) => {
-    state.view = e.target.value;
-    render();
-  });
-
-  el("q").addEventListener("input", (e) => {
-    state.q = e.target.value;
-    render();
-  });
+# ----------------------------
+# Messwerte je Stufe
+# ----------------------------
+def max_rss_bytes() -> Optional[int]:
+    """Höchststand des Prozess-Speichers (RSS); None, wo resource fehlt (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: Bytes
+    return rss if sys.platform == "darwin" else rss * 1024
 
-  el("clearH").addEventListener("click", () => {
-    state.holidays.clear();
-    render();
-  });
 
-  el("modeTourTogether").addEventListener("change", (e) => {
-    state.tourTogether = !!e.target.checked;
-    render();
-  });
+class StageMetrics:
+    """
+    Laufzeit, Zeilen, Bytes und Speicher je Verarbeitungsstufe eines Uploads.
+    Jede Stufe wird als JSON-Zeile geloggt (Logger "quell") und optional an METRICS_FILE angehängt.
 
-  render();
-}
+    peak_bytes: tracemalloc-Spitze der Stufe (nur mit QUELL_TRACE_MEMORY=1; prozessweit,
+                parallele Sessions fließen mit ein). max_rss_bytes: RSS-Höchststand nach der Stufe.
+    """
 
-init();
-</script>
-</body>
-</html>
-"""
+    def __init__(self, upload: str, file_name: str, file_bytes: int) -> None:
+        self.context = {"upload": upload, "file": file_name, "file_bytes": file_bytes}
+        self.stages: List[Dict[str, Any]] = []
+        if TRACE_MEMORY and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        rec: Dict[str, Any] = {"stage": name, "seconds": 0.0, "rows": None, "bytes": None, "peak_bytes": None}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec["seconds"] = round(time.perf_counter() - t0, 4)
+            if tracing:
+                rec["peak_bytes"] = tracemalloc.get_traced_memory()[1] - base
+            rec["max_rss_bytes"] = max_rss_bytes()
+            self.stages.append(rec)
+            self.emit({"event": "stage", **rec})
+
+    def record(self, name: str, seconds: float, **fields: Any) -> None:
+        """Im Worker gemessene Teilstufe (z. B. ein Blatt); zählt nicht zur Gesamtzeit."""
+        rec = {"stage": name, "seconds": seconds, "rows": None, "bytes": None, "peak_bytes": None, **fields}
+        rec["worker"] = True
+        self.stages.append(rec)
+        self.emit({"event": "stage", **rec})
+
+    def summary(self) -> Dict[str, Any]:
+        peaks = [s["peak_bytes"] for s in self.stages if s["peak_bytes"] is not None]
+        return {
+            "seconds": round(sum(s["seconds"] for s in self.stages if not s.get("worker")), 4),
+            "peak_bytes": max(peaks) if peaks else None,
+            "max_rss_bytes": max_rss_bytes(),
+        }
 
+    def emit(self, record: Dict[str, Any]) -> None:
+        line = json.dumps({**self.context, **record}, ensure_ascii=False)
+        log.info(line)
+        if METRICS_FILE:
+            try:
+                with open(METRICS_FILE, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                log.warning("Messwerte konnten nicht geschrieben werden: %s", e)
 
-def render_html(data: Dict[str, Any]) -> str:
-    payload_json = json.dumps(data, ensure_ascii=False)
-    # WICHTIG: kein f-string -> keine {} Probleme
-    return HTML_TEMPLATE.replace("__DATA__", payload_json)
+
+def drop_plan_export() -> None:
+    """Export-Datei der Session löschen (neue Berechnung oder geänderte Eingaben)."""
+    export = st.session_state.pop("plan_export", None)
+    if export is not None:
+        try:
+            os.remove(export[1])
+        except OSError:
+            pass
 
 
 # ----------------------------
 # Main
 # ----------------------------
 if uploaded:
-    try:
-        df = pd.read_excel(uploaded, sheet_name="Direkt 1 - 99", header=None)
-    except Exception as e:
-        st.error(f"Excel konnte nicht gelesen werden: {e}")
-        st.stop()
+    from ingest import load_workbooks
+    from render import objects_json_size, render_html_bytes, render_shards_zip
+
+    files = [(f.name, f.getvalue()) for f in uploaded]
+    cache = get_parse_cache()
+    key = cache_key([raw for _, raw in files], sheet_pattern)
+    cached = cache.get(key)
+
+    if cached is not None:
+        data, outputs, info = cached
+        st.caption(f"Cache: Treffer ({key[:12]}…) – Dateien wurden nicht neu eingelesen.")
+    else:
+        metrics = StageMetrics(key[:12], ", ".join(n for n, _ in files), sum(len(r) for _, r in files))
+
+        # je passendes Blatt eine Aufgabe im gemeinsamen Pool (.xlsx/.xlsm gestreamt, .xls über pandas);
+        # unveränderte Blätter und Zeilen kommen aus dem Markt-Speicher
+        try:
+            with metrics.stage("ingest") as rec:
+                data, ingest_info = load_workbooks(
+                    files, sheet_pattern, jobs=INGEST_JOBS, store=get_market_store(), pool=get_ingest_pool()
+                )
+                rec["rows"] = sum(s["rows"] for s in ingest_info["sheets"])
+                rec["markets"] = len(data["markets"])
+                rec["jobs"] = ingest_info["jobs"]
+        except Exception as e:
+            from concurrent.futures.process import BrokenProcessPool
+
+            if isinstance(e, BrokenProcessPool):
+                # Worker abgestürzt: beim nächsten Upload neuer Pool
+                get_ingest_pool.clear()
+            st.error(f"Excel konnte nicht gelesen werden: {e}")
+            st.stop()
+
+        for s in ingest_info["sheets"]:
+            metrics.record(
+                f"blatt: {s['file']} / {s['sheet']}" + (" (Speicher)" if s.get("stored") else ""),
+                s["seconds"],
+                rows=s["rows"],
+                markets=s["markets"],
+                reused=s.get("reused"),
+            )
+
+        # HTML direkt als UTF-8-Bytes (Kopf, Datenblock in Stücken, Rest): eine Kopie je Variante
+        outputs = {}
+        payload_sizes = {}
+        for variant, compress in (("plain", False), ("gzip", True)):
+            with metrics.stage(f"render_{variant}") as rec:
+                outputs[variant], payload_sizes[variant] = render_html_bytes(data, compress=compress)
+                rec["bytes"] = len(outputs[variant])
+
+        info = {
+            # Vergleich: Datenblock im alten Objektformat vs. Spaltenformat
+            "payload_objects": objects_json_size(data),
+            "payload_compact": payload_sizes["plain"],
+            "sheets": ingest_info["sheets"],
+            "duplicates": ingest_info["duplicates"],
+            "jobs": ingest_info["jobs"],
+            "delta": ingest_info["delta"],
+            "metrics": {"stages": metrics.stages, "total": metrics.summary()},
+        }
+        metrics.emit({"event": "upload", "markets": len(data["markets"]), **info["metrics"]["total"]})
+        cache.put(key, data, outputs, info)
+        st.caption(f"Cache: kein Treffer ({key[:12]}…) – neu eingelesen, {len(cache)} Einträge im Cache.")
 
-    try:
-        data = build_data(df)
-    except Exception as e:
-        st.error(f"Fehler beim Verarbeiten: {e}")
-        st.stop()
+    st.success(f"{len(data['markets'])} Märkte geladen. HTML bereit.")
+    sheet_seconds = sum(s["seconds"] for s in info["sheets"])
+    ingest_seconds = next(s["seconds"] for s in info["metrics"]["stages"] if s["stage"] == "ingest")
+    st.caption(
+        f"{len(info['sheets'])} Blätter aus {len({s['file'] for s in info['sheets']})} Dateien "
+        f"mit {info['jobs']} Prozessen in {ingest_seconds:.2f} s gelesen "
+        f"(Summe der Blattzeiten {sheet_seconds:.2f} s)"
+        + (f"; {info['duplicates']} doppelte Märkte (CSB/SAP) entfernt." if info["duplicates"] else ".")
+    )
+    delta = info["delta"]
+    if delta and not delta["first"]:
+        st.caption(
+            f"Gegenüber dem letzten Upload: {delta['added']} neu, {delta['changed']} geändert, "
+            f"{delta['removed']} entfernt."
+        )
+        if delta["changes"]:
+            with st.expander("Geänderte Märkte"):
+                labels = {"added": "neu", "changed": "geändert", "removed": "entfernt"}
+                st.dataframe(
+                    [{"Änderung": labels[c["status"]], "Markt": c["key"], "Name": c["name"]} for c in delta["changes"]],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+    st.caption(
+        f"Datenblock: {info['payload_compact'] / 1024:,.0f} KB im Spaltenformat "
+        f"statt {info['payload_objects'] / 1024:,.0f} KB als Objekte "
+        f"({1 - info['payload_compact'] / max(info['payload_objects'], 1):.0%} kleiner)."
+    )
 
-    html = render_html(data)
+    with st.expander("Messwerte (Einlesen & HTML)" + (" – aus dem Cache" if cached is not None else "")):
+        total = info["metrics"]["total"]
+        st.dataframe(info["metrics"]["stages"], hide_index=True, use_container_width=True)
+        st.caption(
+            f"Gesamt {total['seconds']:.2f} s"
+            + (f", Spitze {total['peak_bytes'] / 1024 ** 2:,.1f} MB (tracemalloc)" if total["peak_bytes"] else "")
+            + (f", RSS-Höchststand {total['max_rss_bytes'] / 1024 ** 2:,.0f} MB" if total["max_rss_bytes"] else "")
+            + ". Speicher je Stufe mit QUELL_TRACE_MEMORY=1, JSON-Zeilen nach QUELL_METRICS_FILE."
+        )
 
-    st.success(f"{len(data['markets'])} Märkte geladen. HTML bereit.")
+    variant = st.radio(
+        "HTML-Variante",
+        ["plain", "gzip", "shards"],
+        format_func=lambda k: {
+            "plain": "Standard (Daten als JSON)",
+            "gzip": "Komprimiert (gzip, entpackt im Browser)",
+            "shards": "ZIP je Tour (lädt Touren bei Bedarf)",
+        }[k] + (f" – {len(outputs[k]) / 1024:,.0f} KB" if k in outputs else ""),
+        horizontal=True,
+    )
+    if variant == "shards":
+        # ZIP: index.html + ein Shard je Tour; erst auf Wunsch erzeugt, dann im Cache-Eintrag
+        if "shards" not in outputs:
+            metrics = StageMetrics(key[:12], ", ".join(n for n, _ in files), sum(len(r) for _, r in files))
+            with st.spinner("ZIP je Tour wird erstellt…"), metrics.stage("render_shards") as rec:
+                blob = render_shards_zip(data)
+                rec["bytes"] = len(blob)
+            outputs = {**outputs, "shards": blob}
+            cache.add_output(key, "shards", blob)
+        st.caption("Entpacken und index.html öffnen; der Ordner shards/ muss daneben liegen.")
     st.download_button(
-        "Interaktive HTML herunterladen",
-        data=html.encode("utf-8"),
-        file_name="belieferung_interaktiv.html",
-        mime="text/html",
+        "Interaktive HTML herunterladen" if variant != "shards" else "ZIP herunterladen",
+        data=outputs[variant],
+        file_name="belieferung_touren.zip" if variant == "shards" else "belieferung_interaktiv.html",
+        mime="application/zip" if variant == "shards" else "text/html",
     )
+
+    # Plan serverseitig rechnen und als Tabelle exportieren (eine Zeile je Markt und Liefertag)
+    with st.expander("Plan exportieren (CSV / Excel)"):
+        import tempfile
+        from datetime import date, timedelta
+
+        from export import write_plan_csv, write_plan_xlsx
+        from feiertage import BUNDESLAENDER
+
+        c1, c2 = st.columns(2)
+        plan_start = c1.date_input("Von", value=date.today(), format="DD.MM.YYYY")
+        plan_end = c2.date_input("Bis", value=date.today() + timedelta(days=6), format="DD.MM.YYYY")
+        land = st.selectbox(
+            "Gesetzliche Feiertage",
+            [""] + list(BUNDESLAENDER),
+            format_func=lambda k: BUNDESLAENDER.get(k, "nur bundesweite"),
+        )
+        extra_text = st.text_input("Zusätzliche Feiertage", help="ISO-Daten mit Komma getrennt, z. B. 2026-12-24, 2026-12-31")
+        plan_together = st.checkbox("Touren zusammenhalten", key="plan_tour_together")
+        plan_format = st.radio(
+            "Format",
+            ["csv", "xlsx"],
+            format_func=lambda k: {"csv": "CSV (Semikolon, UTF-8)", "xlsx": "Excel (.xlsx, langsamer)"}[k],
+            horizontal=True,
+        )
+
+        st.caption(
+            "Der fertige Export liegt als temporäre Datei auf dem Server, nicht in der Session. "
+            "Zum Herunterladen wird er vollständig in den Speicher geladen – bei Excel und langen "
+            "Zeiträumen (ein Jahr × 20 000 Märkte ≈ 2 Mio. Zeilen, ~160 MB) entsprechend viel."
+        )
+
+        # Session hält nur (params, Pfad, Zeilen, Sekunden); geänderte Eingaben verwerfen die Datei
+        params = (key, plan_start, plan_end, land, extra_text, plan_together, plan_format)
+        export = st.session_state.get("plan_export")
+        if export is not None and export[0] != params:
+            drop_plan_export()
+            export = None
+
+        if st.button("Plan berechnen"):
+            drop_plan_export()
+            export = None
+            try:
+                extra = [date.fromisoformat(s.strip()) for s in extra_text.split(",") if s.strip()]
+                t0 = time.perf_counter()
+                # Zeilen gehen direkt in die Datei
+                with tempfile.NamedTemporaryFile(prefix="quell-plan-", suffix="." + plan_format, delete=False) as f:
+                    try:
+                        if plan_format == "csv":
+                            text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+                            rows = write_plan_csv(data, text, plan_start, plan_end, land or None, extra, plan_together)
+                            text.flush()
+                            text.detach()
+                        else:
+                            rows = write_plan_xlsx(data, f, plan_start, plan_end, land or None, extra, plan_together)
+                    except BaseException:
+                        f.close()
+                        os.remove(f.name)
+                        raise
+                export = st.session_state["plan_export"] = (params, f.name, rows, time.perf_counter() - t0)
+            except ValueError as e:
+                st.error(f"Plan konnte nicht erstellt werden: {e}")
+
+        if export is not None and os.path.exists(export[1]):
+            _, path, rows, seconds = export
+            st.caption(f"{rows:,} Zeilen in {seconds:.2f} s ({os.path.getsize(path) / 1024:,.0f} KB).")
+            with open(path, "rb") as f:
+                st.download_button(
+                    "Plan herunterladen",
+                    data=f,
+                    file_name=f"plan_{plan_start:%Y%m%d}_{plan_end:%Y%m%d}.{plan_format}",
+                    mime="text/csv"
+                    if plan_format == "csv"
+                    else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                )
 else:
     st.info("Bitte Excel hochladen.")
@@ -0,0 +1,329 @@
+# render.py
+# Daten -> Standalone interaktive HTML (template.html + kompakter Datenblock)
+#
+# Varianten: Datenblock als JSON oder gzip+base64 in einer Seite (render_html, write_html streamt in eine
+# Datei) und ZIP mit Index-Seite + einem Daten-Shard je Tour (write_shards_zip).
+
+import base64
+import gzip
+import io
+import json
+import os
+import sys
+import zlib
+from array import array
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Set, Tuple
+
+if TYPE_CHECKING:
+    from ingest import Market
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "template.html")
+
+# Listen im Datenblock werden in Blöcken dieser Länge serialisiert (write_html)
+PAYLOAD_CHUNK = 20000
+
+PAYLOAD_TYPES = {False: "application/json", True: "application/gzip+base64"}
+
+
+@lru_cache(maxsize=None)
+def template_parts() -> Tuple[str, str, str]:
+    """
+    template.html einmal pro Prozess lesen und an den Platzhaltern zerlegen:
+    (Kopf bis __PAYLOAD_TYPE__, Stück bis __DATA__, Rest).
+    """
+    with open(TEMPLATE_PATH, encoding="utf-8", newline="") as f:
+        html = f.read()
+    head, rest = html.split("__PAYLOAD_TYPE__", 1)
+    mid, tail = rest.split("__DATA__", 1)
+    return head, mid, tail
+
+
+def _dict_column(values: List[str]) -> Dict[str, List[Any]]:
+    index: Dict[str, int] = {}
+    idx = [index.setdefault(v, len(index)) for v in values]
+    return {"dict": list(index), "idx": idx}
+
+
+def payload_fields(data: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """
+    Felder des Datenblocks nacheinander (Reihenfolge wie im JSON). Jede Spalte wird erst beim
+    Abruf gebaut, beim Streamen (write_html) lebt also nur die aktuelle Spalte im Speicher.
+    """
+    markets = data["markets"]
+    yield "meta", data["meta"]
+    yield "n", len(markets)
+    # Market-Tupel: csb, sap, name, street, zip, city, pattern
+    for i, key in enumerate(("csb", "sap", "name", "street")):
+        yield key, [m[i] for m in markets]
+    yield "zip", _dict_column([m.zip for m in markets])
+    yield "city", _dict_column([m.city for m in markets])
+
+    tours: Dict[str, int] = {"": 0}
+    pattern = [tours.setdefault(t, len(tours)) for m in markets for t in m.pattern]
+    yield "tours", list(tours)
+    yield "pattern", pattern
+
+
+def encode_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Kompaktes Spaltenformat für die HTML: ein Array je Feld statt ein Objekt je Markt.
+    PLZ und Ort als Wörterbuch + Index, Touren als gemeinsames Wörterbuch ("" = Index 0)
+    und das Muster als flaches Array mit 6 Tour-Indizes je Markt (Mo–Sa).
+    """
+    return dict(payload_fields(data))
+
+
+_dumps = partial(json.dumps, ensure_ascii=False, separators=(",", ":"))
+
+
+def _iter_json(value: Any) -> Iterator[str]:
+    # Objekte je Feld, lange Listen in Blöcken à PAYLOAD_CHUNK -> C-Encoder, aber nie der ganze Block als ein String
+    if isinstance(value, dict):
+        sep = "{"
+        for k, v in value.items():
+            yield sep + _dumps(k) + ":"
+            sep = ","
+            yield from _iter_json(v)
+        yield "}" if value else "{}"
+    elif isinstance(value, list) and len(value) > PAYLOAD_CHUNK:
+        yield "["
+        for i in range(0, len(value), PAYLOAD_CHUNK):
+            yield ("," if i else "") + _dumps(value[i : i + PAYLOAD_CHUNK])[1:-1]
+        yield "]"
+    else:
+        yield _dumps(value)
+
+
+def iter_payload_json(data: Dict[str, Any]) -> Iterator[str]:
+    """
+    Datenblock (encode_payload) als JSON in Stücken; "".join(...) == payload_json(data).
+    "</" maskiert, damit der Inhalt das <script>-Tag nicht beenden kann. Jedes Stück endet an einer
+    Wertgrenze, ein "</" kann also nicht über zwei Stücke verteilt sein.
+    """
+    sep = "{"
+    for key, value in payload_fields(data):
+        yield sep + _dumps(key) + ":"
+        sep = ","
+        for s in _iter_json(value):
+            yield s.replace("</", "<\\/")
+        del value
+    yield "}"
+
+
+def payload_json(data: Dict[str, Any]) -> str:
+    # kompakt serialisiert; "</" maskiert (siehe iter_payload_json)
+    return "".join(iter_payload_json(data))
+
+
+def objects_json_size(data: Dict[str, Any]) -> int:
+    """len(json.dumps(data, ensure_ascii=False).encode()) im alten Objektformat (Market.to_dict), blockweise berechnet."""
+    dumps = partial(json.dumps, ensure_ascii=False)
+    markets = data["markets"]
+    rest = {k: v for k, v in data.items() if k != "markets"}
+    # {"meta": {...}, "markets": [...]} -> Gerüst ohne Märkte + Märkte blockweise mit ", " dazwischen
+    size = len(dumps({**rest, "markets": []}).encode("utf-8"))
+    for i in range(0, len(markets), PAYLOAD_CHUNK):
+        block = [m.to_dict() for m in markets[i : i + PAYLOAD_CHUNK]]
+        size += len(dumps(block).encode("utf-8")) - 2 + (2 if i else 0)
+    return size
+
+
+def payload_gzip_b64(data: Dict[str, Any]) -> str:
+    # mtime=0 -> gleiche Daten ergeben identische Bytes (Cache/Vergleich)
+    raw = gzip.compress(payload_json(data).encode("utf-8"), mtime=0)
+    return base64.b64encode(raw).decode("ascii")
+
+
+def render_html(data: Dict[str, Any], compress: bool = False) -> str:
+    """
+    compress=False: Payload als JSON im Klartext.
+    compress=True:  Payload gzip + base64, die Seite entpackt ihn per DecompressionStream.
+    """
+    payload = payload_gzip_b64(data) if compress else payload_json(data)
+    head, mid, tail = template_parts()
+    return "".join((head, PAYLOAD_TYPES[compress], mid, payload, tail))
+
+
+@lru_cache(maxsize=None)
+def _template_bytes(compress: bool) -> Tuple[bytes, bytes]:
+    # Kopf inkl. Payload-Typ und Rest als UTF-8, einmal pro Prozess
+    head, mid, tail = template_parts()
+    return (head + PAYLOAD_TYPES[compress] + mid).encode("utf-8"), tail.encode("utf-8")
+
+
+def write_html(data: Dict[str, Any], out: BinaryIO, compress: bool = False) -> int:
+    """
+    Wie render_html, schreibt aber direkt UTF-8 in out (Datei, BytesIO): Kopf, Datenblock in
+    Stücken, Rest. Kein vollständiger JSON-String, keine HTML-Kopie als str. Gleiche Bytes wie
+    render_html(...).encode("utf-8"). Rückgabe: Größe des Datenblocks in Bytes.
+    """
+    head, tail = _template_bytes(compress)
+    out.write(head)
+    size = 0
+
+    if compress:
+        # gzip-Strom (wbits=31, mtime=0) und base64 in 3-Byte-Vielfachen, damit Stücke aneinanderpassen
+        z = zlib.compressobj(9, zlib.DEFLATED, 31)
+        pending = b""
+
+        def emit(raw: bytes, final: bool = False) -> int:
+            nonlocal pending
+            pending += raw
+            cut = len(pending) if final else len(pending) - len(pending) % 3
+            if not cut:
+                return 0
+            b64 = base64.b64encode(pending[:cut])
+            pending = pending[cut:]
+            out.write(b64)
+            return len(b64)
+
+        for s in iter_payload_json(data):
+            size += emit(z.compress(s.encode("utf-8")))
+        size += emit(z.flush(), final=True)
+    else:
+        for s in iter_payload_json(data):
+            b = s.encode("utf-8")
+            out.write(b)
+            size += len(b)
+
+    out.write(tail)
+    return size
+
+
+def render_html_bytes(data: Dict[str, Any], compress: bool = False) -> Tuple[bytes, int]:
+    """
+    HTML als UTF-8-Bytes über write_html in einen BytesIO-Puffer.
+    getvalue() gibt den Puffer ohne weitere Kopie zurück (Puffer wird danach nicht mehr beschrieben).
+    Rückgabe: (HTML, Größe des Datenblocks).
+    """
+    buf = io.BytesIO()
+    size = write_html(data, buf, compress)
+    return buf.getvalue(), size
+
+
+# ----------------------------
+# Aufteilung je Tour (ZIP mit Index-Seite + Daten-Shards)
+# ----------------------------
+SHARD_INDEX_TYPE = "application/x-quell-index+json"
+
+# Suchverzeichnis: Trigramme (wie trigrams() in der Seite) -> Hash-Bucket -> Bitmaske der Shards
+SHARD_GRAM_BUCKETS = (1024, 65536)
+
+
+def _natural_key(tour: str) -> Tuple[int, Any]:
+    # "ohne Tour" zuletzt, Nummern numerisch, Rest alphabetisch
+    if not tour:
+        return (2, "")
+    return (0, int(tour)) if tour.isdecimal() else (1, tour)
+
+
+def shard_groups(data: Dict[str, Any]) -> List[Tuple[str, List[int]]]:
+    """
+    Tour -> Markt-IDs (aufsteigend). Ein Markt steht in jedem Shard seiner Touren (Mo–Sa),
+    Märkte ganz ohne Tour im Shard "".
+    """
+    groups: Dict[str, List[int]] = {}
+    for mid, m in enumerate(data["markets"]):
+        tours = {t for t in m.pattern if t}
+        for t in tours or ("",):
+            groups.setdefault(t, []).append(mid)
+    return sorted(groups.items(), key=lambda kv: _natural_key(kv[0]))
+
+
+def _hay_units(m: "Market") -> "array[int]":
+    # Suchtext wie m._hay in der Seite, als UTF-16-Einheiten (JS zählt substr in UTF-16)
+    units = array("H", f"{m.name} {m.city} {m.csb} {m.sap}".lower().encode("utf-16-le"))
+    if sys.byteorder == "big":
+        units.byteswap()
+    return units
+
+
+def _gram_hash(a: int, b: int, c: int) -> int:
+    # FNV-1a (32 Bit) über drei UTF-16-Einheiten, identisch zu gramHash() in der Seite
+    h = 2166136261
+    for u in (a, b, c):
+        h = ((h ^ u) * 16777619) & 0xFFFFFFFF
+    return h
+
+
+def shard_gram_bits(data: Dict[str, Any], groups: List[Tuple[str, List[int]]]) -> Dict[str, Any]:
+    """
+    Je Hash-Bucket eine Bitmaske der Shards, deren Märkte ein Trigramm aus dem Bucket enthalten.
+    Die Seite verknüpft die Masken aller Trigramme eines Suchbegriffs per UND und lädt nur die
+    verbleibenden Shards (Kollisionen laden höchstens einen Shard zu viel, nie zu wenig).
+
+    Die Bits werden Shard für Shard gesetzt (Trigramme nur des laufenden Shards im Speicher),
+    zunächst mit der größten Bucket-Zahl; danach wird auf die nötige Größe gefaltet
+    (h & (b-1) ist der Rest von h & (hi-1) modulo b).
+    """
+    markets = data["markets"]
+    lo, hi = SHARD_GRAM_BUCKETS
+    width = (len(groups) + 7) // 8
+    bits = bytearray(hi * width)
+    row_of: Dict[Tuple[int, int, int], int] = {}
+    widest = 0
+
+    for k, (_, mids) in enumerate(groups):
+        byte, bit = k >> 3, 1 << (k & 7)
+        grams: Set[Tuple[int, int, int]] = set()
+        for mid in mids:
+            u = _hay_units(markets[mid])
+            grams.update(zip(u, u[1:], u[2:]))
+        for gram in grams:
+            row = row_of.get(gram)
+            if row is None:
+                row = row_of[gram] = (_gram_hash(*gram) & (hi - 1)) * width
+            bits[row + byte] |= bit
+        widest = max(widest, len(grams))
+
+    buckets = lo
+    while buckets < hi and buckets < 2 * widest:
+        buckets *= 2
+
+    # falten: Block r enthält die Buckets r*buckets … (r+1)*buckets-1
+    step = buckets * width
+    folded = 0
+    for r in range(0, len(bits), step):
+        folded |= int.from_bytes(bits[r : r + step], "little")
+
+    return {"buckets": buckets, "width": width, "bits": base64.b64encode(folded.to_bytes(step, "little")).decode("ascii")}
+
+
+def shard_payload_json(data: Dict[str, Any], mids: List[int]) -> str:
+    """Datenblock eines Shards: Spaltenformat der Teilmenge + globale Markt-IDs ("ids")."""
+    sub = {"meta": data["meta"], "markets": [data["markets"][i] for i in mids]}
+    return '{"ids":' + _dumps(mids) + "," + payload_json(sub)[1:]
+
+
+def write_shards_zip(data: Dict[str, Any], out: BinaryIO) -> Dict[str, int]:
+    """
+    ZIP: index.html (Seite + Tour-Verzeichnis) und shards/NNNN.js (je Tour ein Skript, das seine Daten
+    per window.__quellShard(i, {...}) meldet). Skripte statt fetch(), damit die entpackte Seite
+    auch per file:// ihre Shards nachladen kann.
+    Rückgabe: {shards, markets, bytes_index}
+    """
+    import zipfile
+
+    groups = shard_groups(data)
+    index = {
+        "meta": data["meta"],
+        "n": len(data["markets"]),
+        "shards": [{"file": f"shards/{k:04d}.js", "tour": t, "n": len(mids)} for k, (t, mids) in enumerate(groups)],
+        "grams": shard_gram_bits(data, groups),
+    }
+    head, mid, tail = template_parts()
+    page = "".join((head, SHARD_INDEX_TYPE, mid, _dumps(index).replace("</", "<\\/"), tail)).encode("utf-8")
+
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("index.html", page)
+        for k, (_, mids) in enumerate(groups):
+            zf.writestr(index["shards"][k]["file"], f"window.__quellShard({k},{shard_payload_json(data, mids)});\n")
+
+    return {"shards": len(groups), "markets": len(data["markets"]), "bytes_index": len(page)}
+
+
+def render_shards_zip(data: Dict[str, Any]) -> bytes:
+    buf = io.BytesIO()
+    write_shards_zip(data, buf)
+    return buf.getvalue()
@@ -0,0 +1,290 @@
+# store.py
+# Persistenter Markt-Speicher (SQLite) für Delta-Einlesen über mehrere Uploads hinweg
+#
+#   records     Zeilen-Hash (Rohwerte A–L) -> normalisierter Markt (ingest.Market)
+#   sheets      Blatt-Stand: Fingerabdruck der Mappe + Blattname -> Zeilen-Hashes (sheet_rows, in Reihenfolge)
+#   current     zuletzt eingelesener Bestand je Upload (sortierte Dateinamen + Blattmuster, upload_key):
+#               Schlüssel (CSB, sonst SAP, sonst Name) -> Zeilen-Hash; uploads merkt die letzte Nutzung
+#
+# Unveränderte Blätter kommen ohne Excel-Lesen aus dem Speicher; in geänderten Blättern werden nur
+# Zeilen mit neuem Hash normalisiert (ingest.read_sheet mit known = Hashes früherer Stände desselben
+# Blatts). Der Vergleich mit current desselben Uploads liefert neue, geänderte und entfernte Märkte;
+# andere Depots / Sessions mit anderen Dateien haben ihren eigenen Bestand.
+
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from ingest import Market, make_market
+
+# so viele Blatt-Stände bzw. Upload-Bestände bleiben erhalten (älteste zuerst verworfen)
+MAX_SHEETS = 20
+MAX_UPLOADS = 20
+# höchstens so viele Einzeländerungen in der Rückgabe von update_current
+MAX_CHANGES = 1000
+# SQLite erlaubt begrenzt viele Parameter je Abfrage
+_CHUNK = 500
+
+# Spalten in Reihenfolge von Market (pattern als sechs Spalten Mo–Sa; "do" ist ein SQL-Schlüsselwort)
+_COLUMNS = 'csb, sap, name, street, zip, city, "mo", "di", "mi", "do", "fr", "sa"'
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS records (
+    hash TEXT PRIMARY KEY,
+    csb TEXT, sap TEXT, name TEXT, street TEXT, zip TEXT, city TEXT,
+    "mo" TEXT, "di" TEXT, "mi" TEXT, "do" TEXT, "fr" TEXT, "sa" TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sheets (
+    source TEXT PRIMARY KEY,
+    file TEXT, sheet TEXT, rows INTEGER, used REAL
+);
+CREATE TABLE IF NOT EXISTS sheet_rows (
+    source TEXT, pos INTEGER, hash TEXT,
+    PRIMARY KEY (source, pos)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sheet_rows_hash ON sheet_rows (hash);
+CREATE TABLE IF NOT EXISTS uploads (
+    upload TEXT PRIMARY KEY,
+    used REAL
+);
+CREATE TABLE IF NOT EXISTS current (
+    upload TEXT, key TEXT, hash TEXT,
+    PRIMARY KEY (upload, key)
+) WITHOUT ROWID;
+"""
+
+
+def workbook_fingerprint(raw: bytes, file_name: str) -> str:
+    """
+    Inhalt einer Mappe als Hash. .xlsx/.xlsm: Prüfsummen aller Teile außer docProps/ (Autor,
+    Speicherzeit), damit erneutes Speichern ohne Änderung denselben Fingerabdruck ergibt.
+    Sonst (.xls, kaputte ZIPs): Hash der Bytes.
+    """
+    h = hashlib.sha256()
+    if not file_name.lower().endswith(".xls"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(raw)) as z:
+                for info in sorted(z.infolist(), key=lambda i: i.filename):
+                    if not info.filename.startswith("docProps/"):
+                        h.update(f"{info.filename}\0{info.CRC}\0{info.file_size}\n".encode("utf-8"))
+            return "zip:" + h.hexdigest()
+        except zipfile.BadZipFile:
+            pass
+    h.update(raw)
+    return "raw:" + h.hexdigest()
+
+
+def sheet_source(fingerprint: str, sheet_name: str) -> str:
+    return f"{fingerprint}/{sheet_name}"
+
+
+def upload_key(file_names: Iterable[str], sheet_pattern: str) -> str:
+    """Identität eines Uploads für den Bestandsvergleich: gleiche Dateien + Blattmuster = gleicher Bestand."""
+    return "\n".join(sorted(file_names)) + "\0" + sheet_pattern
+
+
+def market_key(m: Market) -> str:
+    if m.csb:
+        return "csb:" + m.csb
+    if m.sap:
+        return "sap:" + m.sap
+    return "name:" + m.name
+
+
+def _to_row(h: str, m: Market) -> Tuple[str, ...]:
+    return (h,) + m[:6] + m.pattern
+
+
+def _from_row(r: Sequence[str]) -> Market:
+    # r ohne Hash: csb … city, mo … sa
+    return make_market(*r[:6], r[6:12])
+
+
+def _chunks(items: Sequence[Any], n: int = _CHUNK) -> Iterable[Sequence[Any]]:
+    for i in range(0, len(items), n):
+        yield items[i : i + n]
+
+
+class MarketStore:
+    """SQLite-Datei mit normalisierten Märkten; von allen Sessions eines Prozesses geteilt (Lock)."""
+
+    def __init__(self, path: str, max_sheets: int = MAX_SHEETS, max_uploads: int = MAX_UPLOADS):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_sheets = max_sheets
+        self.max_uploads = max_uploads
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # ältere Dateien: ein gemeinsamer Bestand ohne Upload-Spalte -> verwerfen
+        columns = {r[1] for r in self._db.execute("PRAGMA table_info(current)")}
+        if columns and "upload" not in columns:
+            self._db.execute("DROP TABLE current")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ---- Blatt-Stände ----
+    def load_sheet(self, source: str) -> Optional[Tuple[List[Market], List[str], int]]:
+        """Gespeicherter Blatt-Stand -> (Märkte, Zeilen-Hashes, Zeilen im Blatt) oder None."""
+        with self._lock:
+            hit = self._db.execute("SELECT rows FROM sheets WHERE source = ?", (source,)).fetchone()
+            if hit is None:
+                return None
+            cur = self._db.execute(
+                f"SELECT r.hash, {', '.join('r.' + c for c in _COLUMNS.split(', '))} "
+                "FROM sheet_rows s JOIN records r ON r.hash = s.hash WHERE s.source = ? ORDER BY s.pos",
+                (source,),
+            )
+            hashes: List[str] = []
+            markets: List[Market] = []
+            for r in cur:
+                hashes.append(r[0])
+                markets.append(_from_row(r[1:]))
+            with self._db:
+                self._db.execute("UPDATE sheets SET used = ? WHERE source = ?", (time.time(), source))
+            return markets, hashes, hit[0]
+
+    def known_hashes(self, file_name: str, sheet_name: str) -> Set[str]:
+        """Zeilen-Hashes der gespeicherten Stände desselben Blatts (gleicher Datei- und Blattname)."""
+        with self._lock:
+            return {
+                r[0]
+                for r in self._db.execute(
+                    "SELECT DISTINCT s.hash FROM sheet_rows s JOIN sheets t ON t.source = s.source "
+                    "WHERE t.file = ? AND t.sheet = ?",
+                    (file_name, sheet_name),
+                )
+            }
+
+    def records(self, hashes: Sequence[str]) -> Dict[str, Market]:
+        out: Dict[str, Market] = {}
+        with self._lock:
+            for part in _chunks(list(hashes)):
+                cur = self._db.execute(
+                    f"SELECT hash, {_COLUMNS} FROM records WHERE hash IN ({', '.join('?' * len(part))})", part
+                )
+                for r in cur:
+                    out[r[0]] = _from_row(r[1:])
+        return out
+
+    def save_sheet(
+        self,
+        source: str,
+        file_name: str,
+        sheet_name: str,
+        rows: int,
+        markets: Sequence[Market],
+        hashes: Sequence[str],
+    ) -> None:
+        """Blatt-Stand speichern (neue Datensätze + Zeilenfolge); danach alte Stände verwerfen."""
+        with self._lock, self._db:
+            self._db.executemany(
+                f"INSERT OR IGNORE INTO records (hash, {_COLUMNS}) VALUES ({', '.join('?' * 13)})",
+                (_to_row(h, m) for h, m in zip(hashes, markets)),
+            )
+            self._db.execute("DELETE FROM sheet_rows WHERE source = ?", (source,))
+            self._db.executemany(
+                "INSERT INTO sheet_rows (source, pos, hash) VALUES (?, ?, ?)",
+                ((source, i, h) for i, h in enumerate(hashes)),
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO sheets (source, file, sheet, rows, used) VALUES (?, ?, ?, ?, ?)",
+                (source, file_name, sheet_name, rows, time.time()),
+            )
+            self._prune()
+
+    def _prune(self) -> None:
+        old = [
+            r[0]
+            for r in self._db.execute(
+                "SELECT source FROM sheets ORDER BY used DESC LIMIT -1 OFFSET ?", (self.max_sheets,)
+            )
+        ]
+        if not old:
+            return
+        for part in _chunks(old):
+            marks = ", ".join("?" * len(part))
+            self._db.execute(f"DELETE FROM sheet_rows WHERE source IN ({marks})", part)
+            self._db.execute(f"DELETE FROM sheets WHERE source IN ({marks})", part)
+        # Datensätze, die weder ein Blatt-Stand noch der aktuelle Bestand braucht
+        self._db.execute(
+            "DELETE FROM records WHERE hash NOT IN (SELECT hash FROM sheet_rows) "
+            "AND hash NOT IN (SELECT hash FROM current)"
+        )
+
+    # ---- Bestand ----
+    def update_current(self, upload: str, markets: Sequence[Market], hashes: Sequence[str]) -> Dict[str, Any]:
+        """
+        Neuen Bestand mit dem zuletzt eingelesenen desselben Uploads (upload_key) vergleichen und ihn ersetzen.
+        Geändert heißt: gleicher Schlüssel, anderer normalisierter Inhalt (z. B. 1201 statt "1201"
+        in Excel zählt nicht). Märkte nur mit Namen werden bei gleichem Namen durchnummeriert.
+        Rückgabe: {first, added, changed, removed, changes: [{status, key, name}] (höchstens MAX_CHANGES)}
+        """
+        # gleicher Schlüssel mehrfach (nur Name, weder CSB noch SAP: merge_markets behält alle):
+        # Wiederholungen in Bestandsreihenfolge als "name:X#2", "name:X#3", … statt zu überschreiben
+        new: Dict[str, Tuple[str, Market]] = {}
+        seen: Dict[str, int] = {}
+        for m, h in zip(markets, hashes):
+            key = market_key(m)
+            n = seen[key] = seen.get(key, 0) + 1
+            new[key if n == 1 else f"{key}#{n}"] = (h, m)
+
+        with self._lock:
+            old = dict(self._db.execute("SELECT key, hash FROM current WHERE upload = ?", (upload,)))
+
+        candidates = [k for k, (h, _) in new.items() if k in old and old[k] != h]
+        removed = [k for k in old if k not in new]
+        before = self.records([old[k] for k in candidates + removed])
+
+        changes: List[Dict[str, str]] = []
+        counts = {"added": 0, "changed": 0, "removed": 0}
+
+        def note(status: str, key: str, name: str) -> None:
+            counts[status] += 1
+            if len(changes) < MAX_CHANGES:
+                changes.append({"status": status, "key": key, "name": name})
+
+        if old:
+            for k, (_, m) in new.items():
+                if k not in old:
+                    note("added", k, m.name)
+            for k in candidates:
+                m = new[k][1]
+                if before.get(old[k]) != m:
+                    note("changed", k, m.name)
+            for k in removed:
+                gone = before.get(old[k])
+                note("removed", k, gone.name if gone else "")
+        else:
+            # erster Upload: kein Vergleich, alles neu
+            counts["added"] = len(new)
+
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM current WHERE upload = ?", (upload,))
+            self._db.executemany(
+                "INSERT INTO current (upload, key, hash) VALUES (?, ?, ?)",
+                ((upload, k, h) for k, (h, _) in new.items()),
+            )
+            self._db.execute("INSERT OR REPLACE INTO uploads (upload, used) VALUES (?, ?)", (upload, time.time()))
+            old_uploads = [
+                r[0]
+                for r in self._db.execute(
+                    "SELECT upload FROM uploads ORDER BY used DESC LIMIT -1 OFFSET ?", (self.max_uploads,)
+                )
+            ]
+            for part in _chunks(old_uploads):
+                marks = ", ".join("?" * len(part))
+                self._db.execute(f"DELETE FROM current WHERE upload IN ({marks})", part)
+                self._db.execute(f"DELETE FROM uploads WHERE upload IN ({marks})", part)
+
+        return {"first": not old, **counts, "changes": changes}
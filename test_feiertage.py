@@ -0,0 +1,77 @@
+# test_feiertage.py
+# Feiertagskalender gegen bekannte Daten: Ostern, Buß- und Bettag, Reformationstag.
+
+from datetime import date
+
+import pytest
+
+from feiertage import BUNDESLAENDER, easter_sunday, holidays, holidays_between
+
+
+@pytest.mark.parametrize(
+    "year, easter",
+    [
+        (2000, date(2000, 4, 23)),
+        (2008, date(2008, 3, 23)),
+        (2011, date(2011, 4, 24)),
+        (2019, date(2019, 4, 21)),
+        (2024, date(2024, 3, 31)),
+        (2025, date(2025, 4, 20)),
+        (2026, date(2026, 4, 5)),
+        (2038, date(2038, 4, 25)),
+    ],
+)
+def test_easter_sunday(year, easter):
+    assert easter_sunday(year) == easter
+
+
+def test_moving_holidays_2026():
+    h = holidays(2026, "NW")
+
+    assert h[date(2026, 4, 3)] == "Karfreitag"
+    assert h[date(2026, 4, 6)] == "Ostermontag"
+    assert h[date(2026, 5, 14)] == "Christi Himmelfahrt"
+    assert h[date(2026, 5, 25)] == "Pfingstmontag"
+    assert h[date(2026, 6, 4)] == "Fronleichnam"
+
+
+@pytest.mark.parametrize(
+    "year, bettag",
+    [
+        (2022, date(2022, 11, 16)),  # 23.11. ist ein Mittwoch -> Mittwoch davor
+        (2033, date(2033, 11, 16)),  # ebenso
+        (2024, date(2024, 11, 20)),
+        (2025, date(2025, 11, 19)),
+        (2026, date(2026, 11, 18)),
+    ],
+)
+def test_buss_und_bettag_only_in_saxony(year, bettag):
+    assert holidays(year, "SN")[bettag] == "Buß- und Bettag"
+    assert bettag not in holidays(year, "BY")
+    assert bettag not in holidays(year)
+
+
+def test_reformationstag():
+    # 2017 einmalig bundesweit
+    assert holidays(2017)[date(2017, 10, 31)] == "Reformationstag"
+    assert all(date(2017, 10, 31) in holidays(2017, land) for land in BUNDESLAENDER)
+
+    # ab 2018 zusätzlich in den nördlichen Ländern, nicht vorher
+    for land in ("HB", "HH", "NI", "SH"):
+        assert date(2016, 10, 31) not in holidays(2016, land)
+        assert holidays(2018, land)[date(2018, 10, 31)] == "Reformationstag"
+    assert holidays(2016, "SN")[date(2016, 10, 31)] == "Reformationstag"
+
+    assert date(2018, 10, 31) not in holidays(2018)
+    assert date(2018, 10, 31) not in holidays(2018, "BY")
+
+
+def test_holidays_between_spans_years():
+    h = holidays_between(date(2025, 12, 24), date(2026, 1, 6), "BW")
+
+    assert list(h) == [date(2025, 12, 25), date(2025, 12, 26), date(2026, 1, 1), date(2026, 1, 6)]
+
+
+def test_unknown_state():
+    with pytest.raises(ValueError):
+        holidays(2026, "XX")
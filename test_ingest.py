@@ -0,0 +1,96 @@
+# test_ingest.py
+# Parität: spaltenweises Einlesen (_markets_from_frame) gegen die bisherige Zeile-für-Zeile-Logik
+# (iterrows + norm_str / norm_tour je Zelle) und gegen den Zeilenpfad (_markets_from_rows).
+
+import math
+import random
+from typing import Any, List
+
+import pandas as pd
+import pytest
+
+from ingest import Market, _markets_from_frame, _markets_from_rows, make_market, norm_str, norm_tour
+
+# Zellwerte, wie sie aus Excel / pd.read_excel kommen können
+CELLS = [
+    None,
+    math.nan,
+    pd.NA,
+    "",
+    "   ",
+    "\t",
+    " Köln ",
+    "Markt 1",
+    "1201",
+    "1201.0",
+    " 1201.0 ",
+    "1302.5",
+    "12.0.0",
+    1201,
+    0,
+    -7,
+    1201.0,
+    1302.5,
+    100000.0,
+    0.0,
+]
+
+
+def row_by_row(df: pd.DataFrame) -> List[Market]:
+    # bisherige Logik: jede Zeile einzeln, Zeilen ohne CSB, SAP und Name entfallen
+    markets = []
+    for _, r in df.iterrows():
+        csb, sap, name, street, zipc, city = (norm_str(r.iloc[i]) for i in range(6))
+        if not (csb or sap or name):
+            continue
+        markets.append(make_market(csb, sap, name, street, zipc, city, (norm_tour(r.iloc[6 + i]) for i in range(6))))
+    return markets
+
+
+def random_frame(rng: random.Random, n: int) -> pd.DataFrame:
+    rows: List[List[Any]] = []
+    for _ in range(n):
+        if rng.random() < 0.1:
+            rows.append([None] * 12)  # leere Zeile
+        else:
+            rows.append([rng.choice(CELLS) for _ in range(12)])
+    df = pd.DataFrame(rows, dtype=object)
+    # wie bei read_excel: rein numerische Spalten (mit NaN) als float64
+    for c in rng.sample(range(12), 3):
+        df[c] = [rng.choice([math.nan, 1201.0, 1302.5, 7.0]) for _ in range(n)]
+    return df
+
+
+def test_mixed_frame_matches_row_by_row():
+    df = pd.DataFrame(
+        [
+            [1001, " 5001 ", "Markt 1", "Str 1", 12345, "Köln", 1201, None, 1302.5, math.nan, "1201.0", "  "],
+            [None, None, None, None, None, None, None, None, None, None, None, None],
+            ["   ", math.nan, "", "Str 2", None, "Bonn", 1201.0, 1201, "", None, None, None],
+            [None, None, "Nur Name", None, None, None, "1201.0", "1201.0 ", 100000.0, 0, -7, pd.NA],
+            [1002.0, "", None, "", "", "", None, None, None, None, None, None],
+        ],
+        dtype=object,
+    )
+
+    markets = _markets_from_frame(df)
+
+    assert markets == row_by_row(df)
+    assert [m.csb for m in markets] == ["1001", "", "1002.0"]
+    assert markets[0].pattern == ("1201", "", "1302.5", "", "1201", "")
+    assert markets[1].pattern == ("1201", "1201", "100000", "0", "-7", "")
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_frames_match_row_by_row(seed):
+    df = random_frame(random.Random(seed), 200)
+
+    markets = _markets_from_frame(df)
+
+    assert markets == row_by_row(df)
+    assert markets == _markets_from_rows(df.itertuples(index=False, name=None))
+
+
+def test_frame_needs_twelve_columns():
+    with pytest.raises(ValueError):
+        _markets_from_frame(pd.DataFrame([[1] * 11]))
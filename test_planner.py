@@ -0,0 +1,132 @@
+# test_planner.py
+# Wochenplanung ohne Browser (plan_week): Verschieberegeln, Mindestabstand, Grenzen der KW,
+# "Touren zusammenhalten"; Zeitraum-Planung (plan_range) gegen plan_week.
+
+import random
+from datetime import date
+from typing import Any, Dict
+
+import pytest
+
+from ingest import make_market
+from planner import DAY_KEYS, plan_range, plan_week, range_holidays, week_days
+
+# KW 15/2026 mit Wochenbeginn Montag: Mo 06.04. … So 12.04.
+MO, DI, MI, DO, FR, SA, SO = (f"2026-04-{d:02d}" for d in range(6, 13))
+
+
+def make_data(*patterns: Dict[str, str], min_gap: int = 1, sunday: bool = False) -> Dict[str, Any]:
+    # je Muster ein Markt M0, M1, …; Muster als {"mo": Tour, …}
+    markets = [
+        make_market(str(i), "", f"M{i}", "", "", "Köln", (p.get(k, "") for k in DAY_KEYS))
+        for i, p in enumerate(patterns)
+    ]
+    return {"meta": {"weekStartsSunday": sunday, "minGapDays": min_gap}, "markets": markets}
+
+
+def moves(plan: Dict[str, Any]):
+    return sorted((m["market"], m["from"], m["to"]) for m in plan["moved"])
+
+
+def conflicts(plan: Dict[str, Any]):
+    return sorted((c["market"], c["from"]) for c in plan["conflicts"])
+
+
+def test_without_holidays_nothing_moves():
+    plan = plan_week(make_data({"mo": "1201", "do": "1201"}), MI)
+
+    assert plan["days"][0] == MO
+    assert [d["tour"] for d in plan["deliveries"][MO]] == ["1201"]
+    assert plan["moved"] == [] and plan["conflicts"] == []
+
+
+def test_monday_holiday_moves_forward():
+    plan = plan_week(make_data({"mo": "1201"}), MO, holidays=[MO])
+
+    assert moves(plan) == [(0, MO, DI)]
+    assert plan["deliveries"][MO] == []
+    assert plan["deliveries"][DI] == [{"market": 0, "tour": "1201", "originalDate": MO}]
+
+
+def test_other_holiday_moves_backward_past_further_holidays():
+    plan = plan_week(make_data({"do": "1201"}), MO, holidays=[DO, MI])
+
+    assert moves(plan) == [(0, DO, DI)]
+
+
+def test_min_gap_conflict():
+    # Mi-Feiertag: Di liegt 1 Tag nach Mo (< 2), Mo ist schon belegt -> Konflikt
+    data = make_data({"mo": "1201", "mi": "1201", "fr": "1201"}, min_gap=2)
+    plan = plan_week(data, MO, holidays=[MI])
+
+    assert plan["moved"] == []
+    assert conflicts(plan) == [(0, MI)]
+    assert plan["conflicts"][0]["type"] == "GAP_OR_RANGE"
+
+
+def test_min_gap_skips_to_allowed_day():
+    # Fr-Feiertag bei Mo-Lieferung und Abstand 2: Do ist frei und weit genug weg
+    plan = plan_week(make_data({"mo": "1201", "fr": "1201"}, min_gap=2), MO, holidays=[FR])
+
+    assert moves(plan) == [(0, FR, DO)]
+
+
+def test_move_does_not_leave_the_week():
+    # Mo-Feiertag, Di–So ebenfalls Feiertag: kein Ausweichen in die nächste KW
+    plan = plan_week(make_data({"mo": "1201"}), MO, holidays=[MO, DI, MI, DO, FR, SA, SO])
+    assert plan["moved"] == [] and conflicts(plan) == [(0, MO)]
+
+    # Wochenbeginn Sonntag (So 05.04. … Sa 11.04.): Mo ist Tag 1, rückwärts nur bis So 05.04.
+    plan = plan_week(make_data({"di": "1201"}, sunday=True), MO, holidays=[DI, MO, "2026-04-05"])
+    assert plan["days"][0] == "2026-04-05"
+    assert plan["moved"] == [] and conflicts(plan) == [(0, DI)]
+
+
+def test_tour_together_moves_group():
+    data = make_data({"mi": "1201"}, {"mi": "1201"}, {"mi": "1302"})
+    plan = plan_week(data, MO, holidays=[MI], tour_together=True)
+
+    assert moves(plan) == [(0, MI, DI), (1, MI, DI), (2, MI, DI)]
+
+
+def test_tour_together_conflicts_as_group():
+    # M1 hat Di und Abstand 2: einzeln weicht nur M0 aus, zusammen bleibt die ganze Tour stehen
+    data = make_data({"mi": "1201"}, {"di": "1201", "mi": "1201"}, min_gap=2)
+
+    single = plan_week(data, MO, holidays=[MI])
+    assert moves(single) == [(0, MI, DI)]
+    assert conflicts(single) == [(1, MI)]
+
+    together = plan_week(data, MO, holidays=[MI], tour_together=True)
+    assert together["moved"] == []
+    assert conflicts(together) == [(0, MI), (1, MI)]
+    assert all("(Tour 1201)" in c["msg"] for c in together["conflicts"])
+
+
+# ----------------------------
+# Zeitraum: plan_range je KW wie plan_week
+# ----------------------------
+def random_data(seed: int, n: int = 300) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    tours = ["1201", "1302", "2101", "3005"]
+    patterns = [{k: rng.choice(tours) for k in DAY_KEYS if rng.random() < 0.4} for _ in range(n)]
+    return make_data(*patterns, min_gap=rng.choice([1, 2, 3]), sunday=bool(seed % 2))
+
+
+@pytest.mark.parametrize("seed, land, together", [(0, "NW", False), (1, "BY", True), (2, None, False), (3, "SN", True)])
+def test_plan_range_matches_plan_week(seed, land, together):
+    data = random_data(seed)
+    extra = [date(2026, 12, 24), date(2026, 12, 31)]
+
+    result = plan_range(data, "2026-01-01", "2026-12-31", bundesland=land, holidays=extra, tour_together=together)
+
+    hol = set(range_holidays(date(2026, 1, 1), date(2026, 12, 31), land, extra))
+    assert len(result["weeks"]) == 53
+    for week in result["weeks"]:
+        days = week_days(week["week_start"], data["meta"]["weekStartsSunday"])
+        ref = plan_week(data, week["week_start"], [d for d in days if d in hol], together)
+        stops = sum(len(v) for v in ref["deliveries"].values())
+        assert (week["stops"], week["moved"], week["conflicts"]) == (stops, len(ref["moved"]), len(ref["conflicts"]))
+        assert week["holidays"] == [d.isoformat() for d in days if d in hol]
+
+    assert result["totals"]["stops"] == sum(w["stops"] for w in result["weeks"])